@@ -4,9 +4,11 @@ import cmath
 import math
 
 import numpy as np
-from scipy.optimize import curve_fit
 from scipy.special import erf
 
+from ie_Framework.Algorithm.erf_fit import fit_erf_batch
+from ie_Framework.Algorithm.fft_backend import get_backend
+
 # General input parameters
 PITCH = 33  # Pitch in um in the grating plane
 PIXEL_SIZE = 3.33  # Pixel size in um
@@ -28,23 +30,15 @@ def crop_center(img, cropx, cropy, shiftDy=0, shiftDx=0):
 
 
 def remove_phase_jumps(phase_data):
-    """Remove +/- 2*pi phase jumps from a 1D phase sequence."""
-    diff = np.diff(phase_data)
+    """
+    Remove +/- 2*pi phase jumps from a 1D phase sequence.
 
-    # Identify large jumps (greater than pi or less than -pi)
+    Returns the frame-to-frame differences; steps larger than pi are
+    replaced by (p[i] - p[i+1]) - sign(p[i] - p[i+1]) * 2*pi as before.
+    """
+    diff = np.diff(phase_data)
     jumps = np.abs(diff) > np.pi
-    _ = jumps  # keep variable for potential debugging
-
-    # Correct the phase values
-    for i in range(0, len(diff)):
-        if np.abs(diff[i]) > np.pi / 1:
-            diff[i] = (
-                phase_data[i]
-                - phase_data[i + 1]
-                - np.sign(phase_data[i] - phase_data[i + 1]) * 2 * np.pi
-            )
-
-    return diff
+    return np.where(jumps, -diff - np.sign(-diff) * 2 * np.pi, diff)
 
 
 def erf_model(x, a, b, c, d):
@@ -52,44 +46,158 @@ def erf_model(x, a, b, c, d):
     return a * erf(b * x + c) + d
 
 
-def calc_grating_fft_phases_frequencies(frame, shiftDy=0, shiftDx=0):
-    """Calculate FFT phases and peak indices for the three main grating orders."""
-    large_array = np.zeros((6000, 6000))
-    small_array = crop_center(frame, 1000, 1000, shiftDy, shiftDx)
-
-    start_x = (large_array.shape[0] - small_array.shape[0]) // 2
-    start_y = (large_array.shape[1] - small_array.shape[1]) // 2
-
-    # Place the cropped array into the large array
-    large_array[
-        start_x : start_x + small_array.shape[0],
-        start_y : start_y + small_array.shape[1],
-    ] = small_array
-
-    img_arr = large_array
-    # img_arr[Set0Start:Set0End] = 100  # Option: zero-out rows for partial image analysis
+# Frequency grid of the phase/frequency estimate: a CROP x CROP centre crop
+# evaluated like a PAD x PAD zero-padded FFT (bin = 1/PAD cycles per pixel).
+# The order indices returned below are indices into that fftshifted grid.
+CROP = 1000
+PAD = 6000
+_ZOOM = PAD // CROP
+# Coarse local maxima refined per order (the strongest padded-FFT bin may sit
+# next to the second strongest coarse bin, e.g. leakage at a region border).
+_CANDIDATES = 3
+# Search regions of the three orders as signed frequencies (row u, column v)
+# in PAD bins, [start, stop) - the slices Absolut[3000:6000, 3500:6000],
+# Absolut[0:2500, 0:3000] and Absolut[0:2700, 3000:6000] of the padded FFT.
+_ORDER_REGIONS = {
+    1: ((0, 3000), (500, 3000)),
+    3: ((-3000, -500), (-3000, 0)),
+    2: ((-3000, -300), (0, 3000)),
+}
+
+
+def _coarse_peaks(mag_half, region, count=_CANDIDATES):
+    """
+    Strongest local maxima of an unpadded rfft2 magnitude near `region`.
+
+    mag_half is |rfft2| of the crop (columns = non-negative frequencies).
+    Regions in the negative column half are searched at the conjugate
+    position (|F(-u, -v)| = |F(u, v)| for real images). Coarse bins whose
+    +-_ZOOM neighbourhood touches the region are included, so peaks just
+    inside the region border are not missed. Returns up to `count` signed
+    positions in PAD bins, strongest first.
+    """
+    (u0, u1), (v0, v1) = region
+    n = mag_half.shape[0]
+    u = (((np.arange(n) + n // 2) % n) - n // 2) * _ZOOM
+    v = np.arange(mag_half.shape[1]) * _ZOOM
+    sign = 1
+    if v1 <= 0:
+        sign = -1
+        u0, u1, v0, v1 = -u1 + 1, -u0 + 1, -v1 + 1, -v0 + 1
+    rows = np.flatnonzero((u > u0 - _ZOOM) & (u < u1 + _ZOOM - 1))
+    cols = np.flatnonzero((v > v0 - _ZOOM) & (v < v1 + _ZOOM - 1))
+    # Rows in frequency order so neighbouring bins are adjacent in `sub`.
+    rows = rows[np.argsort(u[rows], kind="stable")]
+    sub = mag_half[np.ix_(rows, cols)]
+    # 3x3 local maxima (plateaus count once per pixel)
+    pad = np.pad(sub, 1, mode="constant", constant_values=-1.0)
+    neigh = np.max(
+        [pad[1 + dy : 1 + dy + sub.shape[0], 1 + dx : 1 + dx + sub.shape[1]] for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx],
+        axis=0,
+    )
+    r, c = np.nonzero(sub >= neigh)
+    best = np.argsort(-sub[r, c], kind="stable")[:count]
+    return [(sign * int(u[rows[r[j]]]), sign * int(v[cols[c[j]]])) for j in best]
+
+
+def _zoom_dft(crop, u, v):
+    """
+    DFT of the crop at signed PAD-bin frequencies u (rows) x v (columns).
+
+    Same values as the centred zero-padded FFT (ifftshift -> fft2 ->
+    fftshift) at those bins, via two small matrix products.
+    """
+    r = np.arange(crop.shape[0]) - crop.shape[0] // 2
+    c = np.arange(crop.shape[1]) - crop.shape[1] // 2
+    ey = np.exp(-2j * np.pi * np.outer(u, r) / PAD)
+    ex = np.exp(-2j * np.pi * np.outer(c, v) / PAD)
+    return ey @ crop @ ex
+
+
+def _refine_peak(crop, candidates, region, radius=_ZOOM):
+    """Strongest PAD bin within +-radius of the coarse candidates (clipped to region); returns (u, v, value)."""
+    (u0, u1), (v0, v1) = region
+    best = None
+    for cu, cv in candidates:
+        u = np.arange(max(u0, cu - radius), min(u1, cu + radius + 1))
+        v = np.arange(max(v0, cv - radius), min(v1, cv + radius + 1))
+        if not (u.size and v.size):
+            continue
+        spec = _zoom_dft(crop, u, v)
+        mag = np.abs(spec)
+        r, c = np.unravel_index(mag.argmax(), spec.shape)
+        if best is None or mag[r, c] > best[0]:
+            best = (mag[r, c], int(u[r]), int(v[c]), spec[r, c])
+    return best[1:]
+
+
+def _order_peaks(frame, shiftDy=0, shiftDx=0):
+    """Peak bin (u, v) and DFT value of orders 1-3 of the centre crop: {order: (u, v, value)}."""
+    crop = np.asarray(crop_center(frame, CROP, CROP, shiftDy, shiftDx), dtype=np.float64)
+    # Coarse candidates only; float32 is enough, the refinement runs in float64
+    mag_half = np.abs(get_backend().rfft2(crop.astype(np.float32)))
+    return {
+        order: _refine_peak(crop, _coarse_peaks(mag_half, region), region)
+        for order, region in _ORDER_REGIONS.items()
+    }
+
+
+def _order_indices(peaks):
+    """Indices i, k, l, m, n, o relative to the search windows of the padded FFT."""
+    u1, v1 = peaks[1][:2]
+    u3, v3 = peaks[3][:2]
+    u2, v2 = peaks[2][:2]
+    half = PAD // 2
+    return u1, v1 + half - 3500, u3 + half, v3 + half, u2 + half, v2 + half - 3000
+
+
+def calc_grating_phases_stack(stack, peaks, shiftDy=0, shiftDx=0):
+    """
+    Phases of orders 1, 2, 3 for every frame of `stack` at fixed peak bins.
+
+    The grating frequency does not change within a shift stack, only the
+    phase, so each frame needs one DFT coefficient per order instead of a
+    peak search: F(u, v) = ey(u) . crop . ex(v), i.e. one matrix-vector
+    product of the crop per frame. Returns an array of shape (frames, 3).
+    """
+    orders = (1, 2, 3)
+    u = np.array([peaks[o][0] for o in orders], dtype=np.float64)
+    v = np.array([peaks[o][1] for o in orders], dtype=np.float64)
+    r = np.arange(CROP) - CROP // 2
+    ey = np.exp(-2j * np.pi * np.outer(u, r) / PAD)  # (3, CROP)
+    ex = np.exp(-2j * np.pi * np.outer(r, v) / PAD)  # (CROP, 3)
+    ex_ri = np.hstack([ex.real, ex.imag])  # real matrix product, no complex copy of the crop
+
+    phases = np.empty((len(stack), len(orders)))
+    for z, frame in enumerate(stack):
+        crop = np.asarray(crop_center(frame, CROP, CROP, shiftDy, shiftDx), dtype=np.float64)
+        proj = crop @ ex_ri
+        cols = proj[:, :3] + 1j * proj[:, 3:]  # (CROP, 3): crop @ ex
+        phases[z] = np.angle(np.einsum("or,ro->o", ey, cols))
+    return phases
 
-    # Calculate Fourier transform of the padded image
-    ft = np.fft.ifftshift(img_arr)
-    ft = np.fft.fft2(ft)
-    ft = np.fft.fftshift(ft)
 
-    Absolut = abs(ft)
-
-    # Find maxima of the orders within the defined FFT regions
-    Ord_1 = Absolut[3000:6000, 3500:6000]  # indices [row, column]
-    Ord_3 = Absolut[0:2500, 0:3000]
-    Ord_2 = Absolut[0:2700, 3000:6000]
-    i, k = np.unravel_index(Ord_1.argmax(), Ord_1.shape)
-    l, m = np.unravel_index(Ord_3.argmax(), Ord_3.shape)
-    n, o = np.unravel_index(Ord_2.argmax(), Ord_2.shape)
+def calc_grating_fft_phases_frequencies(frame, shiftDy=0, shiftDx=0):
+    """
+    Calculate FFT phases and peak indices for the three main grating orders.
+
+    Two stages instead of a 6000x6000 zero-padded FFT: the coarse peak of
+    each order comes from an unpadded rfft2 of the 1000x1000 crop (strongest
+    local maxima), then a local matrix DFT evaluates the padded-FFT bins
+    within +-6 bins around them.
+    Indices and phases are those of the padded FFT; memory per frame is a
+    few MB.
+    """
+    peaks = _order_peaks(frame, shiftDy, shiftDx)
+    i, k, l, m, n, o = _order_indices(peaks)
+    f1, f2, f3 = peaks[1][2], peaks[2][2], peaks[3][2]
 
     print("n and o")
     print((3000 - n), o)
 
-    Phase_1 = cmath.phase(ft[i + 3000, k + 3500])
-    Phase_2 = cmath.phase(ft[n, o + 3000])
-    Phase_3 = cmath.phase(ft[l, m])
+    Phase_1 = cmath.phase(f1)
+    Phase_2 = cmath.phase(f2)
+    Phase_3 = cmath.phase(f3)
 
     return Phase_1, Phase_2, Phase_3, i, k, l, m, n, o
 
@@ -126,8 +234,8 @@ def SingleImageGratingAngle(frame, shiftDy=0, shiftDx=0):
     return AVGWinkel
 
 
-def calc_grating_angle_from_fft_freq(index_i, index_k, index_l, index_m, index_n, index_o):
-    """Calculate grating angle relative to the camera from FFT order indices."""
+def _grating_angles(index_i, index_k, index_l, index_m, index_n, index_o):
+    """Grating angles (AVGWinkel, Winkel_1, Winkel_2, Winkel_3, Winkel_1_Nr2, Winkel_1Mess, WinkelCam_Fehler)."""
     Winkel_3 = math.degrees(math.atan((3000 - index_m) / (3000 - index_l)))
     Winkel_1 = 120 - Winkel_3 - 90
     Winkel_1Mess = math.degrees(math.atan((index_i / (index_k + 500))))
@@ -136,6 +244,20 @@ def calc_grating_angle_from_fft_freq(index_i, index_k, index_l, index_m, index_n
 
     AVGWinkel = (Winkel_1_Nr2 + Winkel_1 + Winkel_1Mess) / 3
     WinkelCam_Fehler = AVGWinkel - THEORIE_WINKEL_DEG
+    return AVGWinkel, Winkel_1, Winkel_2, Winkel_3, Winkel_1_Nr2, Winkel_1Mess, WinkelCam_Fehler
+
+
+def calc_grating_angle_from_fft_freq(index_i, index_k, index_l, index_m, index_n, index_o):
+    """Calculate grating angle relative to the camera from FFT order indices."""
+    (
+        AVGWinkel,
+        Winkel_1,
+        Winkel_2,
+        Winkel_3,
+        Winkel_1_Nr2,
+        Winkel_1Mess,
+        WinkelCam_Fehler,
+    ) = _grating_angles(index_i, index_k, index_l, index_m, index_n, index_o)
 
     print("Grating angle to camera in deg from order 1-3:")
     print(Winkel_1)
@@ -152,9 +274,53 @@ def calc_grating_angle_from_fft_freq(index_i, index_k, index_l, index_m, index_n
     return AVGWinkel, Winkel_1, Winkel_2, Winkel_3, Winkel_1_Nr2, Winkel_1Mess, WinkelCam_Fehler
 
 
+def _erf_edge_positions(profiles, x_data):
+    """
+    Batch ERF fit of edge profiles (n, m); returns c/b of a*erf(b*x + c) + d per profile.
+
+    Raises RuntimeError if a fit does not converge (like curve_fit did).
+    """
+    fit = fit_erf_batch(x_data, profiles)
+    if not np.all(fit["converged"]):
+        raise RuntimeError("ERF edge fit did not converge")
+    params = fit["params"]
+    return params[:, 2] / params[:, 1]
+
+
+def _erf_edge_position(profile, x_data):
+    """ERF fit of one edge profile; returns c/b of a*erf(b*x + c) + d."""
+    return float(_erf_edge_positions(profile, x_data)[0])
+
+
+def _edge_shifts(center_first, center_last, PosV0=None):
+    """
+    Vertical and horizontal edge shift between two centre crops (SchubV, SchubH).
+
+    The vertical edge comes from the row means; for the horizontal edge both
+    crops are cut by the vertical shift first so the same rows are compared.
+    PosV0 (edge position of center_first) can be passed if already known.
+    """
+    size = center_first.shape[0]
+    x_v = np.linspace(0, size, size)
+    x_h = np.linspace(size, 0, size)
+    if PosV0 is None:
+        PosV0, PosVEnd = _erf_edge_positions(
+            np.stack([np.mean(center_first, axis=1), np.mean(center_last, axis=1)]), x_v
+        )
+    else:
+        PosVEnd = _erf_edge_position(np.mean(center_last, axis=1), x_v)
+    SchubV = PosVEnd - PosV0
+
+    cut = int(SchubV)
+    PosH0, PosHEnd = _erf_edge_positions(
+        np.stack([np.mean(center_first[cut:], axis=0), np.mean(center_last[: -cut], axis=0)]), x_h
+    )
+    SchubH = PosHEnd - PosH0
+    return SchubV, SchubH
+
+
 def AnalysePiezoAngleGratingEdge(shiftstack, shiftDy=0, shiftDx=0):
     """Compute piezo angle using edge-based ERF fits and FFT-derived grating angles."""
-    piezo_angle = 0
     num_frames = shiftstack.shape[0]
 
     shiftstack_rot90CCW = np.rot90(shiftstack, k=1, axes=(1, 2))
@@ -189,59 +355,15 @@ def AnalysePiezoAngleGratingEdge(shiftstack, shiftDy=0, shiftDx=0):
         WinkelCam_Fehler,
     ) = calc_grating_angle_from_fft_freq(index_i, index_k, index_l, index_m, index_n, index_o)
 
-    # Determine shift length in the vertical direction
-    mittelwerte_zeilen0 = np.mean(center_array[0], axis=1)
-    mittelwerte_zeilenEnd = np.mean(center_array[num_frames - 1], axis=1)
-
-    # ERF fit for the first frame vertical edge
-    x_data = np.linspace(0, 400, 400)
-    y_data = mittelwerte_zeilen0
-    params, covariance = curve_fit(erf_model, x_data, y_data, p0=[1, 0.5, 0.5, 0.5])
-    a_fit, b_fit, c_fit, d_fit = params
-    _ = (a_fit, d_fit)  # keep for potential debugging
-    PosV0 = c_fit / b_fit
-
-    # ERF fit for the last frame vertical edge
-    x_data = np.linspace(0, 400, 400)
-    y_data = mittelwerte_zeilenEnd
-    params, covariance = curve_fit(erf_model, x_data, y_data, p0=[1, 0.5, 0.5, 0.5])
-    a_fit, b_fit, c_fit, d_fit = params
-    _ = (a_fit, d_fit)
-    PosVEnd = c_fit / b_fit
-
-    # Vertical shift output
-    SchubV = PosVEnd - PosV0
+    SchubV, SchubH = _edge_shifts(center_array[0], center_array[num_frames - 1])
+    piezo_angle = _edge_angle_report(SchubV, SchubH, Winkel_1, Winkel_1Mess, Winkel_1_Nr2)
+    return piezo_angle, AVGWinkel
+
+
+def _edge_angle_report(SchubV, SchubH, Winkel_1, Winkel_1Mess, Winkel_1_Nr2):
+    """Shift vector angle from the edge shifts (report printed as before)."""
     print("Vertical shift")
     print(SchubV)
-
-    # Determine shift length in the horizontal direction
-    center_array_0shift = center_array[0]
-    center_array_Endshift = center_array[num_frames - 1]
-
-    center_array_0shift = center_array_0shift[(int(SchubV)) :]
-    center_array_Endshift = center_array_Endshift[: -(int(SchubV))]
-
-    mittelwerte_spalten0 = np.mean(center_array_0shift, axis=0)
-    mittelwerte_spaltenEnd = np.mean(center_array_Endshift, axis=0)
-
-    # ERF fit for the bottom edge
-    x_data = np.linspace(400, 0, 400)
-    y_data = mittelwerte_spalten0
-    params, covariance = curve_fit(erf_model, x_data, y_data, p0=[1, 0.5, 0.5, 0.5])
-    a_fit, b_fit, c_fit, d_fit = params
-    _ = (a_fit, d_fit)
-    PosH0 = c_fit / b_fit
-
-    # ERF fit for the top edge
-    x_data = np.linspace(400, 0, 400)
-    y_data = mittelwerte_spaltenEnd
-    params, covariance = curve_fit(erf_model, x_data, y_data, p0=[1, 0.5, 0.5, 0.5])
-    a_fit, b_fit, c_fit, d_fit = params
-    _ = (a_fit, d_fit)
-    PosHEnd = c_fit / b_fit
-
-    # Horizontal shift
-    SchubH = PosHEnd - PosH0
     print("Horizontal shift")
     print(SchubH)
 
@@ -253,42 +375,27 @@ def AnalysePiezoAngleGratingEdge(shiftstack, shiftDy=0, shiftDx=0):
     print(VWinkel)
     print("Shift vector relative to grating in deg (clockwise positive)")
     print(VWinkelFehler)
-
-    piezo_angle = VWinkel
-    return piezo_angle, AVGWinkel
+    return VWinkel
 
 
-# PIEZO ANGLE FUNCTION BY FFT PHASE SHIFT ANALYSIS
-# ------------------------------------------------
+def _order_vectors(Winkel_1, Winkel_2, Winkel_3):
+    """Unit vectors of orders 1-1, 1-2 and 1-3 (Vektor1, Vektor2, Vektor3)."""
+    Vektor1 = np.array([math.cos(math.radians(Winkel_1)), (-1) * math.sin(math.radians(Winkel_1))])
+    Vektor2 = np.array([(-1) * math.sin(math.radians(Winkel_2)), (1) * math.cos(math.radians(Winkel_2))])
+    Vektor3 = np.array([(-1) * math.sin(math.radians(Winkel_3)), (1) * math.cos(math.radians(Winkel_3))])
+    return Vektor1, Vektor2, Vektor3
 
 
-def AnalysePiezoAngleFFT(shiftstack):
-    """Compute piezo angle using phase shifts of FFT orders across frame stack."""
-    shiftD = 5  # Offset for evaluated portion of the image (unused currently)
-    _ = shiftD
-    piezo_angle = 0
-    num_frames = shiftstack.shape[0]
+def _displacement_vector(Vektor_a, Vektor3, steps_a, steps_3):
+    """Displacement vector from the phase travel (um at the grating) of order 1-1 or 1-2 and order 1-3."""
+    A = np.array([Vektor_a, Vektor3])
+    B = np.array([(-1) * steps_a, steps_3])
+    return np.linalg.solve(A, B)
 
-    # Rotate stack 90 degrees CCW
-    shiftstack_rot90CCW = np.rot90(shiftstack, k=1, axes=(1, 2))
-    print("Shape of rotated stack is :,", shiftstack_rot90CCW.shape)
 
-    Phasenliste_1 = np.zeros(num_frames)
-    Phasenliste_2 = np.zeros(num_frames)
-    Phasenliste_3 = np.zeros(num_frames)
-
-    for z in range(num_frames):
-        (
-            Phasenliste_1[z],
-            Phasenliste_2[z],
-            Phasenliste_3[z],
-            index_i,
-            index_k,
-            index_l,
-            index_m,
-            index_n,
-            index_o,
-        ) = calc_grating_fft_phases_frequencies(shiftstack_rot90CCW[z])
+def _piezo_angle_from_phases(Phasenliste_1, Phasenliste_2, Phasenliste_3, indices):
+    """Piezo angle and grating angle from per-frame order phases (report printed as before)."""
+    index_i, index_k, index_l, index_m, index_n, index_o = indices
 
     # Debugging tools
     print("Phasenliste_2")
@@ -299,10 +406,6 @@ def AnalysePiezoAngleFFT(shiftstack):
     Phasensteps_3c = np.abs(remove_phase_jumps(Phasenliste_3)) * PITCH / (2 * np.pi)
     Phasensteps_2c = np.abs(remove_phase_jumps(Phasenliste_2)) * PITCH / (2 * np.pi)
 
-    Phasensteps_1c_tot = np.sum(Phasensteps_1c)
-    Phasensteps_3c_tot = np.sum(Phasensteps_3c)
-    Phasensteps_2c_tot = np.sum(Phasensteps_2c)
-
     print("Phase steps 2")
     print(Phasensteps_2c)
 
@@ -317,26 +420,16 @@ def AnalysePiezoAngleFFT(shiftstack):
         WinkelCam_Fehler,
     ) = calc_grating_angle_from_fft_freq(index_i, index_k, index_l, index_m, index_n, index_o)
 
-    Vektor1 = np.array([math.cos(math.radians(Winkel_1)), (-1) * math.sin(math.radians(Winkel_1))])
-    Vektor3 = np.array([(-1) * math.sin(math.radians(Winkel_3)), (1) * math.cos(math.radians(Winkel_3))])
-    Vektor2 = np.array([(-1) * math.sin(math.radians(Winkel_2)), (1) * math.cos(math.radians(Winkel_2))])
+    Vektor1, Vektor2, Vektor3 = _order_vectors(Winkel_1, Winkel_2, Winkel_3)
 
     # Displacement vector from orders 1-3 and 1-1
-    A = np.array([Vektor1, Vektor3])
-    B = np.array([(-1) * Phasensteps_1c_tot, Phasensteps_3c_tot])
-    X = np.linalg.solve(A, B)
-
+    X = _displacement_vector(Vektor1, Vektor3, np.sum(Phasensteps_1c), np.sum(Phasensteps_3c))
     V_Winkel = math.degrees(math.atan(X[0] / X[1]))
     V_Winkel_Fehler = -1 * (WinkelCam_Fehler - V_Winkel)
 
     # Displacement vector from orders 1-3 and 1-2 (still to be refined)
-    A2 = np.array([Vektor2, Vektor3])
-    B2 = np.array([(-1) * Phasensteps_2c_tot, Phasensteps_3c_tot])
-    X2 = np.linalg.solve(A2, B2)
-
+    X2 = _displacement_vector(Vektor2, Vektor3, np.sum(Phasensteps_2c), np.sum(Phasensteps_3c))
     V_Winkel2 = math.degrees(math.atan(X2[0] / X2[1]))
-    V_Winkel_Fehler2 = -1 * (WinkelCam_Fehler - V_Winkel2)
-    _ = V_Winkel_Fehler2
 
     print("V-Winkel2")
     print(V_Winkel2)
@@ -356,3 +449,202 @@ def AnalysePiezoAngleFFT(shiftstack):
 
     piezo_angle = V_Winkel
     return piezo_angle, AVGWinkel
+
+
+# PIEZO ANGLE FUNCTION BY FFT PHASE SHIFT ANALYSIS
+# ------------------------------------------------
+
+
+def AnalysePiezoAngleFFT(shiftstack, reference_frame=0, per_frame=False):
+    """
+    Compute piezo angle using phase shifts of FFT orders across frame stack.
+
+    The order frequencies are estimated once on `reference_frame`; every
+    frame then only contributes one DFT coefficient per order (see
+    calc_grating_phases_stack). per_frame=True repeats the full peak search
+    on every frame as before (indices of the last frame are used).
+    """
+    num_frames = shiftstack.shape[0]
+
+    # Rotate stack 90 degrees CCW
+    shiftstack_rot90CCW = np.rot90(shiftstack, k=1, axes=(1, 2))
+    print("Shape of rotated stack is :,", shiftstack_rot90CCW.shape)
+
+    if per_frame:
+        Phasenliste_1 = np.zeros(num_frames)
+        Phasenliste_2 = np.zeros(num_frames)
+        Phasenliste_3 = np.zeros(num_frames)
+        for z in range(num_frames):
+            (
+                Phasenliste_1[z],
+                Phasenliste_2[z],
+                Phasenliste_3[z],
+                index_i,
+                index_k,
+                index_l,
+                index_m,
+                index_n,
+                index_o,
+            ) = calc_grating_fft_phases_frequencies(shiftstack_rot90CCW[z])
+    else:
+        peaks = _order_peaks(shiftstack_rot90CCW[reference_frame])
+        index_i, index_k, index_l, index_m, index_n, index_o = _order_indices(peaks)
+        phases = calc_grating_phases_stack(shiftstack_rot90CCW, peaks)
+        Phasenliste_1, Phasenliste_2, Phasenliste_3 = phases[:, 0], phases[:, 1], phases[:, 2]
+
+    return _piezo_angle_from_phases(
+        Phasenliste_1, Phasenliste_2, Phasenliste_3, (index_i, index_k, index_l, index_m, index_n, index_o)
+    )
+
+
+# INCREMENTAL SHIFT-STACK ANALYSIS
+# --------------------------------
+
+
+def _slope(x, y):
+    """Least-squares slope of y over x and its standard error (inf below 3 points)."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    keep = np.isfinite(y)
+    x, y = x[keep], y[keep]
+    if x.size < 2:
+        return np.nan, np.inf
+    xm = x - x.mean()
+    sxx = float(xm @ xm)
+    if sxx <= 0:
+        return np.nan, np.inf
+    slope = float(xm @ (y - y.mean())) / sxx
+    if x.size < 3:
+        return slope, np.inf
+    resid = y - y.mean() - slope * xm
+    return slope, math.sqrt(float(resid @ resid) / (x.size - 2) / sxx)
+
+
+class ShiftStackAnalyzer:
+    """
+    Frame-by-frame piezo shift analysis, e.g. while the stack is acquired.
+
+    add() takes the frames in the orientation AnalysePiezoAngleFFT /
+    AnalysePiezoAngleGratingEdge expect for their stack and updates a
+    running estimate: the accumulated phase travel (method "fft") or edge
+    shift (method "edge") is fitted linearly over the piezo position and the
+    shift angle follows from the slopes. The slope standard errors give the
+    angle uncertainty; `converged` is True once at least `min_frames` frames
+    are in and that uncertainty is below `tolerance_mrad`.
+
+    result() returns this slope estimate, i.e. the angle `sigma_mrad`
+    belongs to. The batch functions use the first and last frame only
+    (summed phase steps / edge shift to the last frame); both agree within
+    the uncertainty of the end points, not bit for bit. The reachable
+    uncertainty depends on the stack (the edge fit is limited by the
+    grating under the edge), so tolerance_mrad has to be checked on the
+    setup before stopping early on it.
+    """
+
+    def __init__(self, method="fft", *, tolerance_mrad=0.5, min_frames=5, shiftDy=0, shiftDx=0):
+        if method not in ("fft", "edge"):
+            raise ValueError(f"unknown method {method!r}; expected 'fft' or 'edge'")
+        self.method = method
+        self.tolerance_mrad = float(tolerance_mrad)
+        self.min_frames = int(min_frames)
+        self.shiftDy = shiftDy
+        self.shiftDx = shiftDx
+        self.positions = []
+        self.phases = []  # fft: (3,) order phases per frame
+        self.shifts = []  # edge: (SchubV, SchubH) per frame
+        self.angle_deg = np.nan
+        self.sigma_mrad = np.inf
+        self._peaks = None
+        self._angles = None
+        self._travel = np.zeros(3)
+        self._travels = []
+        self._center0 = None
+        self._PosV0 = None
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def converged(self):
+        return len(self) >= self.min_frames and self.sigma_mrad <= self.tolerance_mrad
+
+    def add(self, frame, position):
+        """Add the frame taken at piezo `position`; returns (angle_deg, sigma_mrad)."""
+        rot = np.rot90(frame, k=1, axes=(0, 1))
+        if self._peaks is None:
+            self._peaks = _order_peaks(rot)
+            self._angles = _grating_angles(*_order_indices(self._peaks))
+        self.positions.append(float(position))
+        if self.method == "fft":
+            self._add_fft(rot)
+        else:
+            self._add_edge(rot)
+        self._update()
+        return self.angle_deg, self.sigma_mrad
+
+    def _add_fft(self, rot):
+        phase = calc_grating_phases_stack([rot], self._peaks)[0]
+        if self.phases:
+            steps = np.abs(remove_phase_jumps(np.stack([self.phases[-1], phase], axis=1)))[:, 0]
+            self._travel = self._travel + steps * PITCH / (2 * np.pi)
+        self.phases.append(phase)
+        self._travels.append(self._travel)
+
+    def _add_edge(self, rot):
+        center = np.array(crop_center(rot, 400, 400, self.shiftDy, self.shiftDx))
+        if self._center0 is None:
+            self._center0 = center
+            self._PosV0 = _erf_edge_position(np.mean(center, axis=1), np.linspace(0, 400, 400))
+            self.shifts.append((0.0, 0.0))
+            return
+        try:
+            self.shifts.append(_edge_shifts(self._center0, center, self._PosV0))
+        except (RuntimeError, ValueError):
+            # Fit failed or shift below one pixel row (nothing to compare yet)
+            self.shifts.append((np.nan, np.nan))
+
+    def _angle_from_slopes(self, a, b):
+        if self.method == "fft":
+            _avg, Winkel_1, Winkel_2, Winkel_3 = self._angles[:4]
+            Vektor1, _Vektor2, Vektor3 = _order_vectors(Winkel_1, Winkel_2, Winkel_3)
+            X = _displacement_vector(Vektor1, Vektor3, a, b)
+            return math.atan(X[0] / X[1])
+        return math.atan(b / a)
+
+    def _update(self):
+        if len(self) < 2:
+            return
+        if self.method == "fft":
+            travels = np.array(self._travels)
+            (a, sa), (b, sb) = _slope(self.positions, travels[:, 0]), _slope(self.positions, travels[:, 2])
+        else:
+            shifts = np.array(self.shifts)
+            (a, sa), (b, sb) = _slope(self.positions, shifts[:, 0]), _slope(self.positions, shifts[:, 1])
+        if not (np.isfinite(a) and np.isfinite(b)):
+            return
+        try:
+            angle = self._angle_from_slopes(a, b)
+        except (ZeroDivisionError, np.linalg.LinAlgError):
+            return
+        self.angle_deg = math.degrees(angle)
+        if not (np.isfinite(sa) and np.isfinite(sb)):
+            self.sigma_mrad = np.inf
+            return
+        # Error propagation with numeric partial derivatives of the angle
+        da = max(abs(a), 1e-12) * 1e-6
+        db = max(abs(b), 1e-12) * 1e-6
+        ga = (self._angle_from_slopes(a + da, b) - angle) / da
+        gb = (self._angle_from_slopes(a, b + db) - angle) / db
+        self.sigma_mrad = 1e3 * math.hypot(ga * sa, gb * sb)
+
+    def result(self):
+        """(piezo_angle, grating_angle) of the frames added so far; piezo_angle is the slope estimate."""
+        if len(self) < 2:
+            raise RuntimeError("Mindestens zwei Frames noetig")
+        if not np.isfinite(self.angle_deg):
+            raise RuntimeError("Keine auswertbare Verschiebung im Stack (Fit fehlgeschlagen oder Schub < 1 px)")
+        print("Shift vector to camera in deg (clockwise positive), fitted over all frames")
+        print(self.angle_deg)
+        print("Uncertainty in mrad")
+        print(self.sigma_mrad)
+        return self.angle_deg, self._angles[0]
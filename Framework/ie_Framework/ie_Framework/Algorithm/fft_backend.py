@@ -0,0 +1,285 @@
+"""Common FFT entry point for the algorithm library.
+
+All 2D transforms of the library go through ``FFTBackend`` so the
+implementation can be chosen in one place:
+
+- ``"scipy"`` (default): ``scipy.fft`` with ``workers`` threads. pocketfft
+  keeps the twiddle factors of recently used sizes, so repeated frames of
+  the same shape do not pay for them again.
+- ``"pyfftw"``: FFTW plans built once per (transform, shape, dtype) and
+  reused; the planner wisdom is stored on disk (``wisdom_path``) so the
+  planning cost is only paid once per machine. Only available when
+  pyFFTW is installed; "auto" prefers it then.
+- ``"numpy"``: ``numpy.fft`` (reference, single-threaded).
+
+Transforms keep the input precision: float32 input gives complex64
+spectra (half the memory traffic of float64), so callers choose float32
+where the precision is sufficient. ``window()`` returns cached,
+read-only window arrays per shape.
+
+``python -m ie_Framework.Algorithm.fft_backend`` benchmarks the available
+backends on the frame shapes used in the library.
+"""
+
+from __future__ import annotations
+
+import atexit
+import functools
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.fft
+
+try:
+    import pyfftw
+    import pyfftw.builders
+
+    PYFFTW_AVAILABLE = True
+except Exception:
+    pyfftw = None
+    PYFFTW_AVAILABLE = False
+
+BACKEND_SCIPY = "scipy"
+BACKEND_PYFFTW = "pyfftw"
+BACKEND_NUMPY = "numpy"
+BACKENDS = (BACKEND_SCIPY, BACKEND_PYFFTW, BACKEND_NUMPY)
+
+# FFTW planner wisdom; override with IE_FFTW_WISDOM
+DEFAULT_WISDOM_PATH = Path(
+    os.environ.get("IE_FFTW_WISDOM", str(Path.home() / ".ie_framework" / "fftw_wisdom.pickle"))
+)
+
+# Shapes transformed by the library: DinoLite frames (notch filter), tiles of
+# particle_detection_tiled and the grating-analysis centre crop.
+TYPICAL_SHAPES = ((1944, 2592), (2304, 2304), (1000, 1000))
+
+
+def _resolve_name(name: str) -> str:
+    if name == "auto":
+        return BACKEND_PYFFTW if PYFFTW_AVAILABLE else BACKEND_SCIPY
+    if name not in BACKENDS:
+        raise ValueError(f"unknown FFT backend {name!r}; expected 'auto' or one of {BACKENDS}")
+    if name == BACKEND_PYFFTW and not PYFFTW_AVAILABLE:
+        raise RuntimeError("pyFFTW ist nicht installiert")
+    return name
+
+
+class FFTBackend:
+    """
+    2D FFTs with a selectable implementation.
+
+    Parameters
+    ----------
+    name : str
+        ``"auto"``, ``"scipy"``, ``"pyfftw"`` or ``"numpy"``.
+    workers : int
+        Threads per transform (-1: all cores). Individual calls can
+        override it, e.g. workers=1 inside an outer thread pool.
+    wisdom_path : path, optional
+        pyFFTW only: wisdom file loaded on creation and written at exit
+        when new plans were made (None: DEFAULT_WISDOM_PATH).
+    planner_effort : str
+        pyFFTW only: FFTW planner flag for new plans.
+    """
+
+    def __init__(
+        self,
+        name: str = "auto",
+        *,
+        workers: int = -1,
+        wisdom_path: Optional[str | Path] = None,
+        planner_effort: str = "FFTW_MEASURE",
+    ) -> None:
+        self.name = _resolve_name(name)
+        self.workers = int(workers)
+        self.planner_effort = planner_effort
+        self.wisdom_path = Path(wisdom_path) if wisdom_path is not None else DEFAULT_WISDOM_PATH
+        self._plans: Dict[tuple, Tuple[object, threading.Lock]] = {}
+        self._plans_lock = threading.Lock()
+        self._new_plans = False
+        if self.name == BACKEND_PYFFTW:
+            self._load_wisdom()
+            atexit.register(self.save_wisdom)
+
+    # -- pyFFTW -------------------------------------------------------------
+    def _threads(self, workers: Optional[int]) -> int:
+        workers = self.workers if workers is None else int(workers)
+        if workers < 0:
+            return os.cpu_count() or 1
+        return max(1, workers)
+
+    def _load_wisdom(self) -> None:
+        try:
+            with open(self.wisdom_path, "rb") as fh:
+                pyfftw.import_wisdom(pickle.load(fh))
+        except FileNotFoundError:
+            pass
+        except Exception as exc:
+            print(f"FFTW-Wisdom konnte nicht geladen werden: {exc}")
+
+    def save_wisdom(self) -> None:
+        """Write the FFTW wisdom if plans were created since the last save (pyFFTW only)."""
+        if self.name != BACKEND_PYFFTW or not self._new_plans:
+            return
+        try:
+            self.wisdom_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.wisdom_path, "wb") as fh:
+                pickle.dump(pyfftw.export_wisdom(), fh)
+            self._new_plans = False
+        except Exception as exc:
+            print(f"FFTW-Wisdom konnte nicht gespeichert werden: {exc}")
+
+    def _plan(self, kind: str, a: np.ndarray, s: Optional[Tuple[int, int]], threads: int):
+        key = (kind, a.shape, a.dtype.str, s, threads)
+        with self._plans_lock:
+            entry = self._plans.get(key)
+            if entry is None:
+                template = pyfftw.empty_aligned(a.shape, dtype=a.dtype)
+                builder = getattr(pyfftw.builders, kind)
+                plan = builder(template, s=s, threads=threads, planner_effort=self.planner_effort)
+                entry = (plan, threading.Lock())
+                self._plans[key] = entry
+                self._new_plans = True
+        return entry
+
+    def _pyfftw(self, kind: str, a: np.ndarray, s, workers) -> np.ndarray:
+        plan, lock = self._plan(kind, a, s, self._threads(workers))
+        with lock:
+            # The plan's output buffer is reused by the next call
+            return plan(a).copy()
+
+    # -- transforms -----------------------------------------------------------
+    def _run(self, kind: str, a: np.ndarray, s, workers) -> np.ndarray:
+        a = np.asarray(a)
+        s = None if s is None else (int(s[0]), int(s[1]))
+        if self.name == BACKEND_PYFFTW:
+            return self._pyfftw(kind, a, s, workers)
+        if self.name == BACKEND_NUMPY:
+            return getattr(np.fft, kind)(a, s=s)
+        workers = self.workers if workers is None else int(workers)
+        return getattr(scipy.fft, kind)(a, s=s, workers=workers)
+
+    def rfft2(self, a: np.ndarray, s=None, *, workers: Optional[int] = None) -> np.ndarray:
+        """Real 2D FFT (half spectrum); float32 in -> complex64 out."""
+        return self._run("rfft2", a, s, workers)
+
+    def irfft2(self, a: np.ndarray, s=None, *, workers: Optional[int] = None) -> np.ndarray:
+        """Inverse of rfft2; pass `s` for odd widths."""
+        return self._run("irfft2", a, s, workers)
+
+    def fft2(self, a: np.ndarray, s=None, *, workers: Optional[int] = None) -> np.ndarray:
+        return self._run("fft2", a, s, workers)
+
+    def ifft2(self, a: np.ndarray, s=None, *, workers: Optional[int] = None) -> np.ndarray:
+        return self._run("ifft2", a, s, workers)
+
+    def __repr__(self) -> str:
+        return f"FFTBackend({self.name!r}, workers={self.workers})"
+
+
+@functools.lru_cache(maxsize=16)
+def _window(kind: str, shape: Tuple[int, int], dtype: str) -> np.ndarray:
+    fn = {"hann": np.hanning, "hamming": np.hamming, "blackman": np.blackman}.get(kind)
+    if fn is None:
+        raise ValueError(f"unknown window {kind!r}")
+    win = np.outer(fn(shape[0]), fn(shape[1])).astype(dtype)
+    win.setflags(write=False)
+    return win
+
+
+def window(shape: Sequence[int], kind: str = "hann", dtype=np.float32) -> np.ndarray:
+    """Separable 2D window for `shape` (cached, read-only)."""
+    return _window(kind, (int(shape[0]), int(shape[1])), np.dtype(dtype).str)
+
+
+_default: Optional[FFTBackend] = None
+_default_lock = threading.Lock()
+
+
+def get_backend() -> FFTBackend:
+    """Backend used by the library (created on first use, see set_backend)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = FFTBackend(os.environ.get("IE_FFT_BACKEND", "auto"))
+        return _default
+
+
+def set_backend(name: str = "auto", **kwargs) -> FFTBackend:
+    """Select the library-wide backend, e.g. set_backend("scipy", workers=4)."""
+    global _default
+    backend = FFTBackend(name, **kwargs)
+    with _default_lock:
+        _default = backend
+    return backend
+
+
+def benchmark(
+    shapes: Sequence[Tuple[int, int]] = TYPICAL_SHAPES,
+    backends: Optional[Sequence[str]] = None,
+    dtypes: Sequence = (np.float32, np.float64),
+    repeat: int = 5,
+) -> List[dict]:
+    """
+    Time rfft2 + irfft2 per backend, shape and dtype (best of `repeat`).
+
+    The first call per combination (planning) is timed separately as
+    ``first_ms``. Returns one dict per combination.
+    """
+    if backends is None:
+        backends = [b for b in BACKENDS if b != BACKEND_PYFFTW or PYFFTW_AVAILABLE]
+    rng = np.random.default_rng(0)
+    rows = []
+    for shape in shapes:
+        for dtype in dtypes:
+            a = rng.random(shape).astype(dtype)
+            for name in backends:
+                be = FFTBackend(name, wisdom_path=os.devnull) if name == BACKEND_PYFFTW else FFTBackend(name)
+                t0 = time.perf_counter()
+                be.irfft2(be.rfft2(a), s=shape)
+                first = time.perf_counter() - t0
+                best = np.inf
+                for _ in range(max(1, int(repeat))):
+                    t0 = time.perf_counter()
+                    be.irfft2(be.rfft2(a), s=shape)
+                    best = min(best, time.perf_counter() - t0)
+                rows.append(
+                    {
+                        "backend": name,
+                        "shape": tuple(shape),
+                        "dtype": np.dtype(dtype).name,
+                        "first_ms": 1e3 * first,
+                        "best_ms": 1e3 * best,
+                    }
+                )
+    return rows
+
+
+__all__ = [
+    "BACKENDS",
+    "BACKEND_NUMPY",
+    "BACKEND_PYFFTW",
+    "BACKEND_SCIPY",
+    "DEFAULT_WISDOM_PATH",
+    "FFTBackend",
+    "PYFFTW_AVAILABLE",
+    "TYPICAL_SHAPES",
+    "benchmark",
+    "get_backend",
+    "set_backend",
+    "window",
+]
+
+
+if __name__ == "__main__":
+    print(f"{'backend':8} {'shape':>12} {'dtype':8} {'first ms':>9} {'best ms':>9}")
+    for row in benchmark():
+        shape = "x".join(str(v) for v in row["shape"])
+        print(
+            f"{row['backend']:8} {shape:>12} {row['dtype']:8} {row['first_ms']:9.1f} {row['best_ms']:9.1f}"
+        )
@@ -0,0 +1,267 @@
+"""Sharpness metrics for focusing.
+
+Every metric works on a prepared image: grey, cropped to a ROI and reduced
+to a Gaussian pyramid level (``prepare``). On a 2592x1944 DinoLite frame a
+centre ROI of half the size at level 2 leaves 1/64 of the pixels, which is
+what makes a focus step cheap; focus curves keep their peak position
+because defocus blur is much wider than the pyramid filter.
+
+Metrics (larger = sharper):
+
+- ``laplacian``: variance of the Laplacian
+- ``tenengrad``: mean squared Sobel gradient magnitude
+- ``brenner``: mean squared difference of pixels two columns apart
+- ``normalized_variance``: grey-level variance divided by the mean
+- ``fft_energy``: share of the (Hann-windowed) spectrum energy above
+  `fft_cutoff` of the Nyquist frequency
+
+8-bit images take integer paths: derivatives in int16 (``CV_16S``) or as
+saturating absolute differences, squared sums via ``cv2.norm`` - no float
+copies of the image. Other depths are converted to float32 once.
+
+``benchmark`` compares metrics and pyramid levels on recorded focus stacks
+(time per frame, peak position and sharpness of the focus curve, spread of
+the fitted peak over repeated stacks); ``python -m
+ie_Framework.Algorithm.focus_metrics STACK...`` runs it on files.
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from ie_Framework.Algorithm.fft_backend import get_backend, window
+
+# ROI: centre fraction of each side, or (x, y, w, h) in full-frame pixels
+Roi = Union[None, float, Tuple[int, int, int, int]]
+
+
+def prepare(frame: np.ndarray, roi: Roi = 0.5, level: int = 0) -> np.ndarray:
+    """Grey ROI of `frame` at pyramid `level` (each level halves both sides)."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    h, w = gray.shape
+    if isinstance(roi, tuple):
+        x, y, rw, rh = (int(v) for v in roi)
+        gray = gray[max(0, y):y + rh, max(0, x):x + rw]
+    elif roi is not None and float(roi) < 1.0:
+        rh, rw = max(1, int(h * float(roi))), max(1, int(w * float(roi)))
+        y0, x0 = (h - rh) // 2, (w - rw) // 2
+        gray = gray[y0:y0 + rh, x0:x0 + rw]
+    if gray.dtype not in (np.uint8, np.uint16, np.float32):
+        gray = gray.astype(np.float32)
+    for _ in range(int(level)):
+        if min(gray.shape) < 16:
+            break
+        gray = cv2.pyrDown(gray)
+    return gray
+
+
+def _float(img: np.ndarray) -> np.ndarray:
+    return img if img.dtype == np.float32 else img.astype(np.float32)
+
+
+def laplacian(img: np.ndarray) -> float:
+    depth = cv2.CV_16S if img.dtype == np.uint8 else cv2.CV_32F
+    lap = cv2.Laplacian(img if depth == cv2.CV_16S else _float(img), depth)
+    _mean, std = cv2.meanStdDev(lap)
+    return float(std[0, 0]) ** 2
+
+
+def tenengrad(img: np.ndarray) -> float:
+    if img.dtype == np.uint8:
+        gx = cv2.Sobel(img, cv2.CV_16S, 1, 0)
+        gy = cv2.Sobel(img, cv2.CV_16S, 0, 1)
+    else:
+        img = _float(img)
+        gx = cv2.Sobel(img, cv2.CV_32F, 1, 0)
+        gy = cv2.Sobel(img, cv2.CV_32F, 0, 1)
+    return (cv2.norm(gx, cv2.NORM_L2SQR) + cv2.norm(gy, cv2.NORM_L2SQR)) / img.size
+
+
+def brenner(img: np.ndarray) -> float:
+    if img.shape[1] < 3:
+        return 0.0
+    if img.dtype == np.uint8:
+        diff = cv2.absdiff(img[:, 2:], img[:, :-2])
+    else:
+        img = _float(img)
+        diff = img[:, 2:] - img[:, :-2]
+    return cv2.norm(diff, cv2.NORM_L2SQR) / diff.size
+
+
+def normalized_variance(img: np.ndarray) -> float:
+    mean, std = cv2.meanStdDev(img)
+    mean = float(mean[0, 0])
+    return float(std[0, 0]) ** 2 / mean if mean > 0 else 0.0
+
+
+def fft_energy(img: np.ndarray, cutoff: float = 0.25) -> float:
+    """Share of the spectrum energy above `cutoff` x Nyquist (radially)."""
+    img = _float(img)
+    h, w = img.shape
+    spec = get_backend().rfft2((img - float(img.mean())) * window((h, w)))
+    power = spec.real**2 + spec.imag**2
+    fy = np.abs(np.fft.fftfreq(h))[:, None] * 2.0
+    fx = np.fft.rfftfreq(w)[None, :] * 2.0
+    high = (fy * fy + fx * fx) > cutoff * cutoff
+    total = float(power.sum())
+    return float(power[np.broadcast_to(high, power.shape)].sum()) / total if total > 0 else 0.0
+
+
+METRICS: Dict[str, Callable[[np.ndarray], float]] = {
+    "laplacian": laplacian,
+    "tenengrad": tenengrad,
+    "brenner": brenner,
+    "normalized_variance": normalized_variance,
+    "fft_energy": fft_energy,
+}
+
+
+def focus_metric(frame: np.ndarray, method: str = "laplacian", *, roi: Roi = 0.5, level: int = 2) -> float:
+    """Sharpness of `frame` with `method` on the ROI at pyramid `level`."""
+    return make_metric(method, roi=roi, level=level)(frame)
+
+
+def make_metric(method: str = "laplacian", *, roi: Roi = 0.5, level: int = 2) -> Callable[[np.ndarray], float]:
+    """frame -> score callable, e.g. for FocusSearch."""
+    fn = METRICS.get(method)
+    if fn is None:
+        raise ValueError(f"unknown focus metric {method!r}; expected one of {tuple(METRICS)}")
+
+    def metric(frame: np.ndarray) -> float:
+        return float(fn(prepare(frame, roi, level)))
+
+    metric.__name__ = f"{method}_L{level}"
+    return metric
+
+
+# ---------------------------------------------------------------------------
+# Benchmark on recorded focus stacks
+# ---------------------------------------------------------------------------
+FocusStack = Tuple[np.ndarray, Sequence[np.ndarray]]  # (positions, frames)
+
+
+def load_focus_stack(path: Union[str, Path]) -> FocusStack:
+    """
+    Load a focus stack: a multi-page TIFF (positions 0..n-1) or a directory
+    of images whose file names contain the position as first number
+    (e.g. ``z_3150.tif``), sorted by that position.
+    """
+    path = Path(path)
+    if path.is_dir():
+        entries = []
+        for f in path.iterdir():
+            m = re.search(r"-?\d+(?:\.\d+)?", f.stem)
+            if m and f.suffix.lower() in (".tif", ".tiff", ".png", ".bmp", ".jpg"):
+                entries.append((float(m.group()), f))
+        entries.sort()
+        frames = [cv2.imread(str(f), cv2.IMREAD_UNCHANGED) for _pos, f in entries]
+        return np.array([p for p, _f in entries]), frames
+    ok, frames = cv2.imreadmulti(str(path), flags=cv2.IMREAD_UNCHANGED)
+    if not ok:
+        raise OSError(f"Konnte {path} nicht lesen")
+    return np.arange(len(frames), dtype=np.float64), list(frames)
+
+
+def _curve_width(positions: np.ndarray, scores: np.ndarray) -> float:
+    """Width of the focus curve at half height above its floor (in position units)."""
+    lo, hi = float(scores.min()), float(scores.max())
+    if hi <= lo:
+        return float("inf")
+    above = positions[scores >= lo + 0.5 * (hi - lo)]
+    return float(above.max() - above.min())
+
+
+def benchmark(
+    stacks: Iterable[FocusStack],
+    methods: Sequence[str] = tuple(METRICS),
+    levels: Sequence[int] = (0, 1, 2),
+    roi: Roi = 0.5,
+    repeat: int = 1,
+) -> List[dict]:
+    """
+    Compare metrics/levels on focus stacks.
+
+    Per method and level: ``ms_per_frame`` (best of `repeat`), the fitted
+    peak per stack (``peaks``), their spread ``peak_std`` (stacks of the
+    same scene: repeatability), ``width`` (mean half-height width of the
+    focus curve: smaller = sharper peak) and ``contrast`` (mean max/min
+    score ratio).
+    """
+    from ie_Framework.Algorithm.focus_search import fit_peak
+
+    stacks = [(np.asarray(pos, dtype=np.float64), list(frames)) for pos, frames in stacks]
+    rows = []
+    for method in methods:
+        for level in levels:
+            metric = make_metric(method, roi=roi, level=level)
+            peaks, widths, contrasts, best_ms = [], [], [], float("inf")
+            for positions, frames in stacks:
+                for _ in range(max(1, int(repeat))):
+                    t0 = time.perf_counter()
+                    scores = np.array([metric(f) for f in frames])
+                    best_ms = min(best_ms, 1e3 * (time.perf_counter() - t0) / max(1, len(frames)))
+                peak = fit_peak(positions, scores, "gaussian")
+                peaks.append(float(positions[int(np.argmax(scores))]) if peak is None else peak)
+                widths.append(_curve_width(positions, scores))
+                contrasts.append(float(scores.max() / scores.min()) if scores.min() > 0 else float("inf"))
+            rows.append(
+                {
+                    "method": method,
+                    "level": int(level),
+                    "ms_per_frame": best_ms,
+                    "peaks": peaks,
+                    "peak_std": float(np.std(peaks)) if len(peaks) > 1 else 0.0,
+                    "width": float(np.mean(widths)),
+                    "contrast": float(np.mean(contrasts)),
+                }
+            )
+    return rows
+
+
+def _synthetic_stack(focus: float, seed: int, n: int = 21, shape=(972, 1296)) -> FocusStack:
+    """Random texture blurred by the distance to `focus` (demo without recordings)."""
+    rng = np.random.default_rng(seed)
+    base = cv2.GaussianBlur((rng.random(shape) * 255).astype(np.uint8), (0, 0), 1.2)
+    positions = np.linspace(-1000, 1000, n)
+    frames = []
+    for p in positions:
+        img = cv2.GaussianBlur(base, (0, 0), 0.3 + abs(p - focus) / 60.0).astype(np.float32)
+        img += rng.normal(0, 2, shape).astype(np.float32)
+        frames.append(np.clip(img, 0, 255).astype(np.uint8))
+    return positions, frames
+
+
+__all__ = [
+    "METRICS",
+    "benchmark",
+    "brenner",
+    "fft_energy",
+    "focus_metric",
+    "laplacian",
+    "load_focus_stack",
+    "make_metric",
+    "normalized_variance",
+    "prepare",
+    "tenengrad",
+]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        stacks = [load_focus_stack(p) for p in sys.argv[1:]]
+    else:
+        print("Keine Stacks angegeben - synthetische Stacks (Fokus bei 130)")
+        stacks = [_synthetic_stack(130.0, seed) for seed in range(3)]
+    print(f"{'method':20} {'L':>2} {'ms/frame':>9} {'peak std':>9} {'width':>8} {'contrast':>9}")
+    for row in benchmark(stacks):
+        print(
+            f"{row['method']:20} {row['level']:2d} {row['ms_per_frame']:9.2f} {row['peak_std']:9.1f} "
+            f"{row['width']:8.1f} {row['contrast']:9.2f}"
+        )
@@ -0,0 +1,313 @@
+"""Focus search along one axis with few moves.
+
+``FocusSearch`` only knows three callbacks - move the axis, optionally ask
+whether it has settled, grab a frame exposed after a given time - so it
+works with any stage/camera pair. Strategies:
+
+- ``"coarse_to_fine"``: a coarse grid over the range, then grids of a third
+  of the step around the best sample until the step reaches ``min_step``.
+  A narrow peak can fall between the coarse samples; if the best coarse
+  score does not stand out from the median by ``min_prominence``, the grid
+  is halved until it does or the spacing reaches ``max_coarse_step``.
+- ``"golden"``: the same coarse grid to bracket the peak, then
+  golden-section search inside the bracket (one new sample per step).
+- ``"sweep"``: every ``min_step`` over the range (the old behaviour, for
+  comparisons).
+
+The final position comes from a parabola (or a Gaussian, i.e. a parabola
+through the log scores) through the best sample and its two neighbours,
+so the result is not restricted to the sampled grid. Positions already
+measured are not visited again.
+
+Settling is motion-aware when ``is_settled`` is given: the axis is polled
+until it reports the target reached, followed by ``post_settle_s`` for
+mechanical ringing; otherwise a fixed ``settle_s`` is waited. Frames are
+requested with the time the axis settled, so no frame exposed during the
+move is scored. Metrics come from focus_metrics (default: Laplacian
+variance of the centre ROI at pyramid level 2). Every sample is recorded
+in the trace.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from ie_Framework.Algorithm.focus_metrics import Roi, make_metric
+
+STRATEGIES = ("coarse_to_fine", "golden", "sweep")
+PEAK_FITS = ("parabola", "gaussian", None)
+
+_GOLDEN = (math.sqrt(5.0) - 1.0) / 2.0
+
+
+def fit_peak(positions, scores, model: Optional[str] = "parabola") -> Optional[float]:
+    """
+    Vertex of a parabola through three samples around the maximum.
+
+    With "gaussian" the parabola goes through log(score) (all scores must
+    be positive). Returns None when the maximum is at the edge of the
+    samples or the samples do not form a peak; the vertex is clamped to
+    the outer two samples.
+    """
+    if model is None:
+        return None
+    if model not in PEAK_FITS:
+        raise ValueError(f"unknown peak model {model!r}; expected one of {PEAK_FITS}")
+    x = np.asarray(positions, dtype=np.float64)
+    y = np.asarray(scores, dtype=np.float64)
+    order = np.argsort(x)
+    x, y = x[order], y[order]
+    i = int(np.argmax(y))
+    if i == 0 or i == x.size - 1:
+        return None
+    x3, y3 = x[i - 1:i + 2], y[i - 1:i + 2]
+    if model == "gaussian":
+        if np.any(y3 <= 0):
+            return None
+        y3 = np.log(y3)
+    (x0, x1, x2), (y0, y1, y2) = x3, y3
+    denom = (x0 - x1) * (x0 - x2) * (x1 - x2)
+    a = (x2 * (y1 - y0) + x1 * (y0 - y2) + x0 * (y2 - y1)) / denom
+    b = (x2 * x2 * (y0 - y1) + x1 * x1 * (y2 - y0) + x0 * x0 * (y1 - y2)) / denom
+    if not a < 0:
+        return None
+    return float(np.clip(-b / (2.0 * a), x0, x2))
+
+
+class FocusSearch:
+    """
+    Find the position of maximum sharpness.
+
+    Parameters
+    ----------
+    move : callable(pos)
+        Start a move of the focus axis to `pos` (may return immediately).
+    grab : callable(after) -> frame or None
+        Frame exposed after time.monotonic() timestamp `after`.
+    metric : str or callable(frame) -> float
+        Name of a focus_metrics metric (computed on `roi` at pyramid
+        `level`) or a custom score function.
+    is_settled : callable() -> bool, optional
+        True once the axis is at its target. Without it `settle_s` is waited.
+    settle_s, post_settle_s, settle_timeout_s, poll_s : float
+        Fixed settle time; extra time after is_settled; give up polling
+        after settle_timeout_s (then settle_s is waited); polling interval.
+    integer_positions : bool
+        Round positions (motor steps).
+    """
+
+    def __init__(
+        self,
+        move: Callable[[float], Any],
+        grab: Callable[[float], Optional[np.ndarray]],
+        metric: Union[str, Callable[[np.ndarray], float]] = "laplacian",
+        *,
+        is_settled: Optional[Callable[[], bool]] = None,
+        settle_s: float = 0.5,
+        post_settle_s: float = 0.05,
+        settle_timeout_s: float = 5.0,
+        poll_s: float = 0.01,
+        roi: Roi = 0.5,
+        level: int = 2,
+        integer_positions: bool = True,
+    ) -> None:
+        self.move = move
+        self.grab = grab
+        self.metric = make_metric(metric, roi=roi, level=level) if isinstance(metric, str) else metric
+        self.is_settled = is_settled
+        self.settle_s = float(settle_s)
+        self.post_settle_s = float(post_settle_s)
+        self.settle_timeout_s = float(settle_timeout_s)
+        self.poll_s = float(poll_s)
+        self.integer_positions = bool(integer_positions)
+        self.trace: List[Dict[str, Any]] = []
+        self._scores: Dict[float, float] = {}
+        # Only the frame of the best sample is kept (full frames are large).
+        self._best_frame: Optional[np.ndarray] = None
+        self._best_frame_score = -math.inf
+        self._t0 = 0.0
+
+    # -- hardware -------------------------------------------------------------
+    def _pos(self, pos: float) -> float:
+        return float(int(round(pos))) if self.integer_positions else float(pos)
+
+    def _settle(self) -> float:
+        """Wait until the axis has settled; returns the settle timestamp."""
+        if self.is_settled is not None:
+            deadline = time.monotonic() + self.settle_timeout_s
+            try:
+                while not self.is_settled():
+                    if time.monotonic() > deadline:
+                        raise TimeoutError
+                    time.sleep(self.poll_s)
+                if self.post_settle_s > 0:
+                    time.sleep(self.post_settle_s)
+                return time.monotonic()
+            except Exception:
+                pass  # no usable status: fall back to the fixed settle time
+        if self.settle_s > 0:
+            time.sleep(self.settle_s)
+        return time.monotonic()
+
+    def _goto(self, pos: float) -> float:
+        self.move(pos)
+        return self._settle()
+
+    def measure(self, pos: float, phase: str = "") -> float:
+        """Move to `pos` and score a frame there (cached per position)."""
+        pos = self._pos(pos)
+        if pos in self._scores:
+            return self._scores[pos]
+        after = self._goto(pos)
+        frame = self.grab(after)
+        score = float(self.metric(frame)) if frame is not None else -math.inf
+        self._scores[pos] = score
+        if frame is not None and score > self._best_frame_score:
+            self._best_frame, self._best_frame_score = frame, score
+        self.trace.append(
+            {"pos": pos, "score": score, "phase": phase, "t": time.monotonic() - self._t0}
+        )
+        return score
+
+    def _best(self) -> float:
+        return max(self._scores, key=self._scores.get)
+
+    # -- strategies -----------------------------------------------------------
+    def _sweep(self, lo: float, hi: float, min_step: float) -> None:
+        for pos in np.arange(lo, hi + 0.5 * min_step, min_step):
+            self.measure(pos, "sweep")
+
+    def _prominent(self, min_prominence: float) -> bool:
+        scores = np.array([v for v in self._scores.values() if np.isfinite(v)])
+        if scores.size < 3:
+            return False
+        floor = float(np.median(scores))
+        return float(scores.max()) - floor > min_prominence * abs(floor)
+
+    def _coarse(self, lo: float, hi: float, coarse_points: int, max_step: float, min_prominence: float) -> float:
+        n = max(3, int(coarse_points))
+        for pos in np.linspace(lo, hi, n):
+            self.measure(pos, "coarse")
+        step = (hi - lo) / (n - 1)
+        # No sample near the peak: the scores are all on the flat tail
+        while step > max_step and not self._prominent(min_prominence):
+            step /= 2.0
+            for pos in np.arange(lo + step, hi, 2.0 * step):
+                self.measure(pos, "coarse")
+        return step
+
+    def _coarse_to_fine(self, lo: float, hi: float, min_step: float, step: float) -> None:
+        while step / 3.0 >= min_step:
+            step /= 3.0
+            best = self._best()
+            for pos in (best - step, best + step):
+                if lo <= pos <= hi:
+                    self.measure(pos, "fine")
+
+    def _golden(self, lo: float, hi: float, min_step: float, step: float) -> None:
+        # Focus curves are flat far from the peak: bracket the peak on a
+        # coarse grid first, golden-section only inside the bracket.
+        best = self._best()
+        a, b = max(lo, best - step), min(hi, best + step)
+        c = b - _GOLDEN * (b - a)
+        d = a + _GOLDEN * (b - a)
+        fc, fd = self.measure(c, "golden"), self.measure(d, "golden")
+        while (b - a) > 2.0 * min_step:
+            if fc >= fd:
+                b, d, fd = d, c, fc
+                c = b - _GOLDEN * (b - a)
+                fc = self.measure(c, "golden")
+            else:
+                a, c, fc = c, d, fd
+                d = a + _GOLDEN * (b - a)
+                fd = self.measure(d, "golden")
+            if self._pos(c) == self._pos(d):
+                break
+
+    # -- public ----------------------------------------------------------------
+    def run(
+        self,
+        center: float,
+        span: float,
+        *,
+        strategy: str = "coarse_to_fine",
+        min_step: float = 10.0,
+        coarse_points: int = 7,
+        max_coarse_step: Optional[float] = None,
+        min_prominence: float = 0.5,
+        fit: Optional[str] = "parabola",
+        final_frame: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Search [center - span/2, center + span/2] and move to the focus.
+
+        The coarse grid has `coarse_points` samples; it is refined by halving
+        while its best score is less than `min_prominence` (relative) above
+        the median score and the spacing is above `max_coarse_step`
+        (default 3 * min_step). Set `max_coarse_step` to the width of the
+        narrowest expected focus peak.
+
+        Returns a dict with ``position`` (final, fitted if possible),
+        ``best_sample`` and ``best_score`` (best measured), ``frame`` (taken
+        at the final position, or the best sample's frame with
+        final_frame=False), ``moves`` and ``trace``.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown strategy {strategy!r}; expected one of {STRATEGIES}")
+        self.trace = []
+        self._scores.clear()
+        self._best_frame, self._best_frame_score = None, -math.inf
+        self._t0 = time.monotonic()
+        lo, hi = center - span / 2.0, center + span / 2.0
+        min_step = max(float(min_step), 1.0 if self.integer_positions else 0.0)
+
+        if strategy == "sweep":
+            self._sweep(lo, hi, min_step)
+        else:
+            max_step = 3.0 * min_step if max_coarse_step is None else float(max_coarse_step)
+            step = self._coarse(lo, hi, coarse_points, max_step, float(min_prominence))
+            if strategy == "golden":
+                self._golden(lo, hi, min_step, step)
+            else:
+                self._coarse_to_fine(lo, hi, min_step, step)
+
+        valid = {p: s for p, s in self._scores.items() if np.isfinite(s)}
+        if not valid:
+            return {"position": None, "best_sample": None, "best_score": None, "frame": None,
+                    "moves": len(self.trace), "trace": self.trace}
+        best = max(valid, key=valid.get)
+        target = fit_peak(list(valid), list(valid.values()), fit)
+        position = self._pos(target) if target is not None else best
+
+        frame = self._best_frame
+        if final_frame and position != best:
+            after = self._goto(position)
+            fresh = self.grab(after)
+            if fresh is not None:
+                frame = fresh
+                self.trace.append(
+                    {"pos": position, "score": float(self.metric(fresh)), "phase": "final",
+                     "t": time.monotonic() - self._t0}
+                )
+        elif position != self.trace[-1]["pos"]:
+            self._goto(position)
+        return {
+            "position": position,
+            "best_sample": best,
+            "best_score": valid[best],
+            "frame": frame,
+            "moves": len(self.trace),
+            "trace": self.trace,
+        }
+
+
+__all__ = [
+    "FocusSearch",
+    "PEAK_FITS",
+    "STRATEGIES",
+    "fit_peak",
+]
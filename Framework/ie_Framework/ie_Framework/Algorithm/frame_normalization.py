@@ -0,0 +1,289 @@
+"""Conversion of 12/16-bit and float camera frames to 8 bit.
+
+All conversions are a linear stage followed by an optional 8-bit lookup
+table:
+
+- the linear stage maps [lo, hi] to [0, 255] with ``cv2.convertScaleAbs``
+  (one pass, no float temporaries, releases the GIL). An offset of
+  ``-0.5 + 1/1024`` turns its rounding into truncation, so bit-depth
+  reduction matches ``(frame >> 8).astype(np.uint8)`` exactly and max
+  scaling matches the old float32 path to within one grey level.
+- non-linear parts (gamma) are a 256-entry table applied in place with
+  ``cv2.LUT``. Full 65536-entry tables were measured slower than the linear
+  stage itself, so they are not used.
+
+Large frames are split into row blocks that run on a shared thread pool.
+``FrameNormalizer`` keeps the contrast range per exposure setting so the
+histogram is only evaluated when the exposure changes.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Hashable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Added to the linear stage so convertScaleAbs' round-to-nearest truncates.
+_TRUNCATE = -0.5 + 1.0 / 1024.0
+# Frames below this many pixels are converted on the calling thread.
+_PARALLEL_MIN_PIXELS = 1 << 21
+
+MODE_SHIFT = "shift"
+MODE_MAX = "max"
+MODE_AUTO = "auto"
+MODES = (MODE_SHIFT, MODE_MAX, MODE_AUTO)
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _default_workers() -> int:
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=_default_workers(), thread_name_prefix="FrameNorm")
+        return _pool
+
+
+def _run_blocks(fn, frame: np.ndarray, out: np.ndarray, workers: Optional[int]) -> None:
+    """Run fn(src_block, dst_block) over row blocks, in parallel for large frames."""
+    workers = _default_workers() if workers is None else max(1, int(workers))
+    rows = frame.shape[0]
+    if workers == 1 or frame.size < _PARALLEL_MIN_PIXELS or rows < 2 * workers:
+        fn(frame, out)
+        return
+    bounds = np.linspace(0, rows, workers + 1).astype(int)
+    futures = [
+        _executor().submit(fn, frame[a:b], out[a:b]) for a, b in zip(bounds[:-1], bounds[1:]) if b > a
+    ]
+    for f in futures:
+        f.result()
+
+
+@functools.lru_cache(maxsize=32)
+def gamma_lut(gamma: float) -> np.ndarray:
+    """256-entry uint8 table for display gamma (1.0 = identity)."""
+    x = np.arange(256, dtype=np.float64) / 255.0
+    return np.rint(255.0 * x ** (1.0 / float(gamma))).astype(np.uint8)
+
+
+def _linear_to_uint8(frame, alpha, lo, gamma, out, workers) -> np.ndarray:
+    """dst = trunc((clip(frame, lo) - lo) * alpha), then the gamma table."""
+    beta = -float(lo) * alpha + _TRUNCATE
+    if out is None:
+        out = np.empty(frame.shape, dtype=np.uint8)
+    lut = gamma_lut(float(gamma)) if gamma != 1.0 else None
+    # convertScaleAbs takes |x|; values below lo must clip to 0, not mirror.
+    # Float and signed frames can go below any lo, unsigned ones only below lo > 0.
+    floor = np.array(lo, dtype=frame.dtype) if float(lo) > 0 or frame.dtype.kind in "fi" else None
+
+    def _block(src, dst):
+        if floor is not None:
+            src = np.maximum(src, floor)
+        cv2.convertScaleAbs(src, dst=dst, alpha=alpha, beta=beta)
+        if lut is not None:
+            cv2.LUT(dst, lut, dst=dst)
+
+    _run_blocks(_block, frame, out, workers)
+    return out
+
+
+def to_uint8(
+    frame: np.ndarray,
+    *,
+    lo: float = 0.0,
+    hi: Optional[float] = None,
+    gamma: float = 1.0,
+    out: Optional[np.ndarray] = None,
+    workers: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Map [lo, hi] linearly to [0, 255] (truncating), then apply gamma.
+
+    Parameters
+    ----------
+    frame : numpy.ndarray
+        Single-channel frame of any numeric dtype.
+    lo, hi : float
+        Input range; values outside are clipped. hi defaults to the dtype
+        maximum for integer frames and to the frame maximum for floats.
+    gamma : float
+        Display gamma applied through an 8-bit lookup table.
+    out : numpy.ndarray, optional
+        uint8 array of the frame's shape to write into (reused buffers).
+    workers : int, optional
+        Row blocks processed in parallel (default: up to 4).
+    """
+    if hi is None:
+        hi = float(np.iinfo(frame.dtype).max) if frame.dtype.kind in "ui" else float(frame.max(initial=0.0))
+    span = float(hi) - float(lo)
+    alpha = 255.0 / span if span > 0 else 0.0
+    return _linear_to_uint8(frame, alpha, lo, gamma, out, workers)
+
+
+def reduce_bit_depth(frame: np.ndarray, bits: Optional[int] = None, *, gamma=1.0, out=None, workers=None) -> np.ndarray:
+    """
+    Keep the top 8 of `bits` significant bits (``frame >> (bits - 8)``).
+
+    bits defaults to the dtype width, i.e. ``uint16 >> 8`` as used by the
+    views so far; pass 12 for 12-bit sensors to use the full display range.
+    """
+    if frame.dtype == np.uint8 and gamma == 1.0:
+        return frame
+    bits = int(bits) if bits is not None else 8 * frame.dtype.itemsize
+    return _linear_to_uint8(frame, 2.0 ** (8 - bits), 0.0, gamma, out, workers)
+
+
+def scale_to_max(frame: np.ndarray, *, gamma=1.0, out=None, workers=None) -> np.ndarray:
+    """Scale so the frame maximum maps to 255 (all-zero frames stay zero)."""
+    max_val = float(frame.max(initial=0)) if frame.size else 0.0
+    if max_val <= 0:
+        if out is None:
+            return np.zeros(frame.shape, dtype=np.uint8)
+        out.fill(0)
+        return out
+    return to_uint8(frame, hi=max_val, gamma=gamma, out=out, workers=workers)
+
+
+def to_gray8(frame: np.ndarray, *, out=None, workers=None) -> np.ndarray:
+    """BGR -> grey, then non-8-bit frames scaled to their maximum."""
+    if frame.ndim == 3 and frame.shape[2] == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if frame.dtype == np.uint8:
+        return np.ascontiguousarray(frame)
+    return scale_to_max(frame, out=out, workers=workers)
+
+
+def sampled_histogram(frame: np.ndarray, step: int = 4, bins: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Histogram of every `step`-th pixel in both directions.
+
+    Returns (counts, edges) with len(edges) == len(counts) + 1. Integer
+    frames use exact integer bins (bincount) up to the sampled maximum.
+    """
+    step = max(1, int(step))
+    sample = frame[::step, ::step]
+    if frame.dtype.kind == "u" and frame.dtype.itemsize <= 2:
+        counts = np.bincount(sample.ravel())
+        return counts, np.arange(counts.size + 1, dtype=np.float64)
+    return np.histogram(sample, bins=bins)
+
+
+def percentile_range(
+    frame: np.ndarray, low_pct: float = 0.5, high_pct: float = 99.5, *, step: int = 4
+) -> Tuple[float, float]:
+    """(lo, hi) at the given percentiles, estimated from a sampled histogram."""
+    counts, edges = sampled_histogram(frame, step)
+    cdf = np.cumsum(counts, dtype=np.float64)
+    if cdf[-1] <= 0:
+        return 0.0, 1.0
+    cdf /= cdf[-1]
+    lo = float(edges[int(np.searchsorted(cdf, low_pct / 100.0))])
+    hi = float(edges[min(int(np.searchsorted(cdf, high_pct / 100.0)) + 1, edges.size - 1)])
+    return lo, max(hi, lo + 1.0)
+
+
+class FrameNormalizer:
+    """
+    Reusable 8-bit conversion for one view.
+
+    Parameters
+    ----------
+    mode : str
+        ``"shift"``: uint16 -> top 8 of `bits` bits, other dtypes scaled to
+        their maximum (the behaviour of the existing views).
+        ``"max"``: scale to the frame maximum.
+        ``"auto"``: contrast from sampled-histogram percentiles `clip_percent`.
+    bits : int, optional
+        Significant bits of uint16 frames for "shift" (default 16).
+    gamma : float
+        Display gamma applied after the linear stage.
+    clip_percent : (float, float)
+        Lower/upper percentile for "auto".
+    sample_step : int
+        Pixel stride for the "auto" histogram.
+    refresh_frames : int
+        Re-evaluate the "auto" range every n frames at the same exposure
+        (0 = only when the exposure key changes or after invalidate()).
+    """
+
+    def __init__(
+        self,
+        mode: str = MODE_SHIFT,
+        *,
+        bits: Optional[int] = None,
+        gamma: float = 1.0,
+        clip_percent: Tuple[float, float] = (0.5, 99.5),
+        sample_step: int = 4,
+        refresh_frames: int = 0,
+        workers: Optional[int] = None,
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"unknown normalization mode {mode!r}; expected one of {MODES}")
+        self.mode = mode
+        self.bits = bits
+        self.gamma = float(gamma)
+        self.clip_percent = clip_percent
+        self.sample_step = int(sample_step)
+        self.refresh_frames = int(refresh_frames)
+        self.workers = workers
+        self._ranges: dict = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Forget cached contrast ranges (e.g. after the scene changed)."""
+        with self._lock:
+            self._ranges.clear()
+
+    def _auto_range(self, frame: np.ndarray, key: Hashable) -> Tuple[float, float]:
+        with self._lock:
+            cached = self._ranges.get(key)
+            if cached is not None:
+                lo, hi, age = cached
+                if not self.refresh_frames or age < self.refresh_frames:
+                    self._ranges[key] = (lo, hi, age + 1)
+                    return lo, hi
+        lo, hi = percentile_range(frame, *self.clip_percent, step=self.sample_step)
+        with self._lock:
+            self._ranges[key] = (lo, hi, 1)
+        return lo, hi
+
+    def __call__(self, frame: Optional[np.ndarray], exposure: Hashable = None, *, out=None):
+        """Return the 8-bit frame; `exposure` selects the cached contrast range."""
+        if frame is None:
+            return None
+        if frame.ndim == 3 and frame.shape[2] == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.mode == MODE_AUTO:
+            lo, hi = self._auto_range(frame, exposure)
+            return to_uint8(frame, lo=lo, hi=hi, gamma=self.gamma, out=out, workers=self.workers)
+        if self.mode == MODE_SHIFT and frame.dtype == np.uint16:
+            return reduce_bit_depth(frame, self.bits, gamma=self.gamma, out=out, workers=self.workers)
+        if frame.dtype == np.uint8 and self.gamma == 1.0:
+            return frame
+        return scale_to_max(frame, gamma=self.gamma, out=out, workers=self.workers)
+
+
+__all__ = [
+    "FrameNormalizer",
+    "MODES",
+    "MODE_AUTO",
+    "MODE_MAX",
+    "MODE_SHIFT",
+    "gamma_lut",
+    "percentile_range",
+    "reduce_bit_depth",
+    "sampled_histogram",
+    "scale_to_max",
+    "to_gray8",
+    "to_uint8",
+]
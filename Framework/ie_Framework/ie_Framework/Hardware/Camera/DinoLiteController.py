@@ -1,19 +1,163 @@
+import threading
+import time
+
 import cv2
 
+# Aufloesungs-Presets (Breite, Hoehe) der DinoLite-Kamera
+RESOLUTION_PRESETS = {
+    "max": (2592, 1944),
+    "1080p": (1920, 1080),
+    "half": (1296, 972),
+    "vga": (640, 480),
+}
+
+# Pixelformate fuer CAP_PROP_FOURCC; None laesst die Treibervorgabe stehen
+PIXEL_FORMATS = {
+    "mjpeg": "MJPG",
+    "raw": "YUYV",
+}
+
 
 class DinoLiteController:
-    """Wrapper um eine DinoLite-USB-Kamera."""
+    """Wrapper um eine DinoLite-USB-Kamera.
+
+    Optional laeuft ein Grabber-Thread, der den Treiberpuffer staendig leert
+    und nur das zuletzt dekodierte Frame mit Zeitstempel und Sequenznummer
+    vorhaelt. capture_image() liefert dann sofort das aktuelle Frame,
+    capture_fresh() wartet auf ein Frame, das nach einem Zeitpunkt T
+    aufgenommen wurde (z.B. nach einer Stage-Bewegung).
+    """
 
-    def __init__(self, device_index: int = 0):
+    def __init__(self, device_index: int = 0, *, resolution: str = "max", pixel_format: str | None = None,
+                 background: bool = False):
         self.cap = cv2.VideoCapture(device_index)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 2592)    # max width
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 1944)   # max height
         self.running = False
+        self._cond = threading.Condition()
+        self._grabber: threading.Thread | None = None
+        self._grabbing = False
+        self._latest = None
+        self._seq = 0
+        self._grab_error: str | None = None
 
         if not self.cap.isOpened():
             raise ValueError("Kamera konnte nicht geöffnet werden")
 
+        if pixel_format is not None:
+            self._apply_pixel_format(pixel_format)
+        self._apply_resolution(resolution)
+        if background:
+            self.start_grabber()
+
+    # ---- Konfiguration ---------------------------------------------------
+    def _apply_resolution(self, resolution):
+        if isinstance(resolution, str):
+            if resolution not in RESOLUTION_PRESETS:
+                raise ValueError(f"Unbekanntes Aufloesungs-Preset: {resolution}")
+            width, height = RESOLUTION_PRESETS[resolution]
+        else:
+            width, height = resolution
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, int(width))
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, int(height))
+
+    def _apply_pixel_format(self, pixel_format):
+        if pixel_format not in PIXEL_FORMATS:
+            raise ValueError(f"Unbekanntes Pixelformat: {pixel_format}")
+        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*PIXEL_FORMATS[pixel_format]))
+
+    def set_resolution(self, resolution):
+        """Setzt ein Preset aus RESOLUTION_PRESETS oder ein (Breite, Hoehe)-Tupel."""
+        was_grabbing = self._grabbing
+        self.stop_grabber()
+        self._apply_resolution(resolution)
+        if was_grabbing:
+            self.start_grabber()
+
+    def set_pixel_format(self, pixel_format):
+        """Waehlt 'mjpeg' (wenig USB-Bandbreite) oder 'raw' (keine Dekodierung)."""
+        was_grabbing = self._grabbing
+        self.stop_grabber()
+        self._apply_pixel_format(pixel_format)
+        if was_grabbing:
+            self.start_grabber()
+
+    def get_resolution(self):
+        return int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    # ---- Grabber-Thread --------------------------------------------------
+    def start_grabber(self):
+        """Startet den Hintergrund-Grabber (idempotent)."""
+        if self._grabbing:
+            return
+        self._grabbing = True
+        self._grabber = threading.Thread(target=self._grab_loop, name="DinoLiteGrabber", daemon=True)
+        self._grabber.start()
+
+    def stop_grabber(self, timeout: float = 2.0):
+        if not self._grabbing:
+            return
+        self._grabbing = False
+        if self._grabber is not None:
+            self._grabber.join(timeout)
+        self._grabber = None
+        with self._cond:
+            self._cond.notify_all()
+
+    @property
+    def grabber_running(self):
+        return self._grabbing
+
+    def _grab_loop(self):
+        while self._grabbing:
+            ret, frame = self.cap.read()
+            ts = time.monotonic()
+            with self._cond:
+                if not ret:
+                    self._grab_error = "Bild konnte nicht aufgenommen werden"
+                else:
+                    self._grab_error = None
+                    self._seq += 1
+                    self._latest = (frame, ts, self._seq)
+                self._cond.notify_all()
+            if not ret:
+                time.sleep(0.05)
+
+    def latest_frame(self):
+        """Liefert (frame, timestamp, seq) des zuletzt dekodierten Frames oder None."""
+        with self._cond:
+            return self._latest
+
+    def _wait_for(self, predicate, timeout_s):
+        deadline = time.monotonic() + timeout_s
+        with self._cond:
+            while True:
+                latest = self._latest
+                if latest is not None and predicate(latest):
+                    return latest
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._grabbing:
+                    msg = self._grab_error or "Kein aktuelles Frame innerhalb des Timeouts"
+                    raise ValueError(msg)
+                self._cond.wait(remaining)
+
+    def capture_fresh(self, after: float | None = None, timeout_s: float = 2.0):
+        """Liefert ein Frame, dessen Belichtung sicher nach `after` begann.
+
+        `after` ist ein time.monotonic()-Zeitstempel (Default: jetzt). Das
+        erste danach gelesene Frame kann noch vor `after` belichtet worden
+        sein und wird uebersprungen. Gibt (frame, timestamp, seq) zurueck.
+        """
+        if after is None:
+            after = time.monotonic()
+        if not self._grabbing:
+            self.start_grabber()
+        first = self._wait_for(lambda item: item[1] > after, timeout_s)
+        return self._wait_for(lambda item: item[2] > first[2], timeout_s)
+
+    # ---- Bestehende API --------------------------------------------------
     def capture_image(self):
+        if self._grabbing:
+            frame, _ts, _seq = self._wait_for(lambda item: True, 2.0)
+            return frame
         ret, frame = self.cap.read()
         if not ret:
             raise ValueError("Bild konnte nicht aufgenommen werden")
@@ -21,14 +165,20 @@ class DinoLiteController:
 
     def show_live_feed(self):
         self.running = True
+        last_seq = 0
         while self.running:
-            ret, frame = self.cap.read()
-            if not ret:
-                break
-
-            w = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-            h = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-            frame_res = cv2.resize(frame, (int(w/2), int(h/2)))
+            if self._grabbing:
+                try:
+                    frame, _ts, last_seq = self._wait_for(lambda item: item[2] > last_seq, 2.0)
+                except ValueError:
+                    break
+            else:
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+
+            h, w = frame.shape[:2]
+            frame_res = cv2.resize(frame, (int(w/2), int(h/2)), interpolation=cv2.INTER_AREA)
             cv2.imshow("Live Feed", frame_res)
 
             if cv2.waitKey(1) & 0xFF == ord("q"):
@@ -37,6 +187,7 @@ class DinoLiteController:
         cv2.destroyAllWindows()
 
     def release(self):
+        self.stop_grabber()
         self.cap.release()
 
 
@@ -50,6 +201,18 @@ class DummyDinoLite:
     def capture_image(self):
         raise RuntimeError(f"Kamera nicht verfügbar: {self._exc or 'unbekannter Fehler'}")
 
+    def capture_fresh(self, after=None, timeout_s=2.0):
+        raise RuntimeError(f"Kamera nicht verfügbar: {self._exc or 'unbekannter Fehler'}")
+
+    def latest_frame(self):
+        return None
+
+    def start_grabber(self):
+        pass
+
+    def stop_grabber(self, timeout=2.0):
+        pass
+
     def show_live_feed(self):
         print("[WARN] Kamera nicht verfügbar; Live-Feed deaktiviert.")
 
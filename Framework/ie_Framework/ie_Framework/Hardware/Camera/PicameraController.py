@@ -1,4 +1,3 @@
-import os
 import time
 import sys
 import subprocess
@@ -18,9 +17,35 @@ else:
         gp = None
         _PICAM_IMPORT_ERROR = exc
 
+# Direct I2C access for the multiplexer; falls back to the i2cset tool.
+try:
+    from smbus2 import SMBus
+except Exception:
+    try:
+        from smbus import SMBus
+    except Exception:
+        SMBus = None
+
+MUX_I2C_BUS = 1
+MUX_I2C_ADDR = 0x70
+MUX_I2C_REG = 0x00
+# Requests libcamera may still hold when the mux switches; without sensor
+# timestamps these are dropped instead.
+STALE_FRAMES_WITHOUT_TIMESTAMP = 3
+
 
 class Picamera:
-    def __init__(self):
+    """
+    Arducam multi-camera adapter behind a single Picamera2 instance.
+
+    The stream is started once and kept running; switching cameras only
+    changes the multiplexer (GPIO + SMBus) and the sensor controls. Instead of
+    a fixed sleep, captures wait until a frame exposed after the switch (and
+    with the new exposure applied) arrives; if none arrives within
+    max_settle_s, the capture raises TimeoutError.
+    """
+
+    def __init__(self, *, max_settle_s: float = 0.5):
         if Picamera2 is None or gp is None:
             detail = f": {_PICAM_IMPORT_ERROR}" if _PICAM_IMPORT_ERROR else ""
             raise RuntimeError(f"Picamera2 is not available on this system{detail}")
@@ -47,11 +72,15 @@ class Picamera:
             raise
         self.current_camera = None
         self.count = 0
+        self.max_settle_s = float(max_settle_s)
+        self._streaming = False
+        self._selected_channel = None
+        self._applied_controls = None
         self.adapter_info = {
-            "A": {"i2c_cmd": "i2cset -y 1 0x70 0x00 0x04", "gpio_sta": [0, 0, 1]},
-            "B": {"i2c_cmd": "i2cset -y 1 0x70 0x00 0x05", "gpio_sta": [1, 0, 1]},
-            "C": {"i2c_cmd": "i2cset -y 1 0x70 0x00 0x06", "gpio_sta": [0, 1, 0]},
-            "D": {"i2c_cmd": "i2cset -y 1 0x70 0x00 0x07", "gpio_sta": [1, 1, 0]},
+            "A": {"i2c_value": 0x04, "i2c_cmd": "i2cset -y 1 0x70 0x00 0x04", "gpio_sta": [0, 0, 1]},
+            "B": {"i2c_value": 0x05, "i2c_cmd": "i2cset -y 1 0x70 0x00 0x05", "gpio_sta": [1, 0, 1]},
+            "C": {"i2c_value": 0x06, "i2c_cmd": "i2cset -y 1 0x70 0x00 0x06", "gpio_sta": [0, 1, 0]},
+            "D": {"i2c_value": 0x07, "i2c_cmd": "i2cset -y 1 0x70 0x00 0x07", "gpio_sta": [1, 1, 0]},
         }
         self.camera_dict = {
             'Y': {"camera": "A", "controls": {"AeEnable": False, "AnalogueGain": 1.0, "AwbEnable": False, "ColourGains": (1.0, 1.0), "ExposureTime": 1}},
@@ -59,6 +88,12 @@ class Picamera:
             'Z': {"camera": "B", "controls": {"AeEnable": False, "AnalogueGain": 1.0, "AwbEnable": False, "ColourGains": (1.0, 1.0), "ExposureTime": 1}},
             'Z1': {"camera": "C", "controls": {"AeEnable": False, "AnalogueGain": 1.0, "AwbEnable": False, "ColourGains": (1.0, 1.0), "ExposureTime": 1000}},
         }
+        self._bus = None
+        if SMBus is not None:
+            try:
+                self._bus = SMBus(MUX_I2C_BUS)
+            except Exception:
+                self._bus = None
         self.initialize_gpio()
 
     def initialize_gpio(self):
@@ -69,47 +104,130 @@ class Picamera:
         gp.setup(12, gp.OUT)
 
     def select_camera(self, index):
+        """Route the CSI port to adapter channel `index` (no-op if already selected)."""
+        if index == self._selected_channel:
+            return
         channel_info = self.adapter_info.get(index)
         gpio_sta = channel_info["gpio_sta"]
         gp.output(7, gpio_sta[0])
         gp.output(11, gpio_sta[1])
         gp.output(12, gpio_sta[2])
-        os.system(channel_info["i2c_cmd"])
+        if self._bus is not None:
+            self._bus.write_byte_data(MUX_I2C_ADDR, MUX_I2C_REG, channel_info["i2c_value"])
+        else:
+            subprocess.run(
+                channel_info["i2c_cmd"].split(),
+                check=False,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        self._selected_channel = index
 
     def _open_camera(self, axis, preview=False):
         camera_info = self.camera_dict[axis]
         if self.current_camera:
             self.picam2.stop()
+            self._streaming = False
         self.select_camera(camera_info["camera"])
         self.picam2.set_controls(camera_info["controls"])
+        self._applied_controls = camera_info["controls"]
         if preview:
             self.picam2.start_preview(Preview.QT, x=100, y=200, width=800, height=600)
         self.picam2.start()
+        self._streaming = True
+        self.current_camera = axis
+
+    def _ensure_streaming(self):
+        if not self._streaming:
+            self.picam2.start()
+            self._streaming = True
+
+    def _switch_to(self, axis):
+        """Switch mux and controls to `axis` on the running stream.
+
+        The mux is switched first so the new controls go to the new sensor.
+        Returns (switch_time_ns, controls_changed).
+        """
+        camera_info = self.camera_dict[axis]
+        self._ensure_streaming()
+        self.select_camera(camera_info["camera"])
+        controls = camera_info["controls"]
+        controls_changed = controls != self._applied_controls
+        if controls_changed:
+            self.picam2.set_controls(controls)
+            self._applied_controls = controls
         self.current_camera = axis
+        return time.monotonic_ns(), controls_changed
+
+    def _capture_settled(self, switch_ns, controls_changed):
+        """Capture the first frame exposed after a switch.
+
+        Frames whose sensor timestamp predates the switch still show the
+        previous camera and are dropped; without a timestamp the first
+        STALE_FRAMES_WITHOUT_TIMESTAMP frames are dropped. If the controls
+        changed, frames are also dropped until the reported exposure is
+        stable between two consecutive frames. Raises TimeoutError if no
+        such frame arrives within max_settle_s.
+        """
+        deadline = time.monotonic() + self.max_settle_s
+        last_exposure = None
+        seen = 0
+        while True:
+            request = self.picam2.capture_request()
+            try:
+                meta = request.get_metadata() or {}
+                ts = meta.get("SensorTimestamp")
+                exposure = meta.get("ExposureTime")
+                seen += 1
+                fresh = seen > STALE_FRAMES_WITHOUT_TIMESTAMP if ts is None else ts >= switch_ns
+                stable = (not controls_changed) or (exposure is not None and exposure == last_exposure)
+                if fresh:
+                    last_exposure = exposure
+                if fresh and stable:
+                    return request.make_array("main")
+            finally:
+                request.release()
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Kamera {self.current_camera}: kein Frame nach dem Umschalten innerhalb {self.max_settle_s:.2f} s"
+                )
+
+    def _capture(self, axis):
+        switch_ns, controls_changed = self._switch_to(axis)
+        return self._capture_settled(switch_ns, controls_changed)
 
     def capture_pair(self, camera1, camera2):
-        self._open_camera(camera1)
-        time.sleep(0.2)
-        np_img = self.picam2.capture_array()
-        self.picam2.stop()
-        self._open_camera(camera2)
-        time.sleep(0.2)
-        np_img2 = self.picam2.capture_array()
-        self.picam2.stop()
+        np_img = self._capture(camera1)
+        np_img2 = self._capture(camera2)
         self.count += 1
         return np_img, np_img2
 
     def capture_frame(self, axis):
-        self._open_camera(axis)
-        time.sleep(0.2)
-        np_img = self.picam2.capture_array()
-        self.picam2.stop()
+        np_img = self._capture(axis)
         self.count += 1
         return np_img
 
     def test_camera(self, axis):
         self._open_camera(axis, preview=False)
 
+    def close(self):
+        """Stop the persistent stream and release camera and I2C bus."""
+        try:
+            if self._streaming:
+                self.picam2.stop()
+        finally:
+            self._streaming = False
+            self.current_camera = None
+            try:
+                self.picam2.close()
+            except Exception:
+                pass
+            if self._bus is not None:
+                try:
+                    self._bus.close()
+                except Exception:
+                    pass
+                self._bus = None
 
-__all__ = ["Picamera"]
 
+__all__ = ["Picamera", "STALE_FRAMES_WITHOUT_TIMESTAMP"]
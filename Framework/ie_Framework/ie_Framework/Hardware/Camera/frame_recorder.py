@@ -0,0 +1,365 @@
+"""Record camera sessions to disk and replay them as a camera backend.
+
+A recording is a directory containing
+
+- ``recording.json``: dtype, frame shape, chunk size and frames per chunk
+- ``frames_00000.npy`` ...: fixed-size chunks of raw frames (memory-mapped)
+- ``meta_00000.npy`` ...: per-frame metadata as a structured array with
+  ``index``, ``timestamp``, ``exposure_us``, ``stage_x``, ``stage_y``, ``stage_z``
+
+Writing a frame is a single copy into a memory-mapped chunk, so recording
+keeps up with the camera. ``FrameRecording`` opens a recording read-only
+without loading it; ``ReplayCamera`` plays it back with the method names of
+the real camera backends (PCO ``get_frame``, IDS ``aquise_frame``, DinoLite
+``capture_image``).
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+
+META_DTYPE = np.dtype(
+    [
+        ("index", np.int64),
+        ("timestamp", np.float64),
+        ("exposure_us", np.float64),
+        ("stage_x", np.float64),
+        ("stage_y", np.float64),
+        ("stage_z", np.float64),
+    ]
+)
+
+_INDEX_FILE = "recording.json"
+
+
+def _chunk_paths(root: Path, chunk: int) -> tuple[Path, Path]:
+    return root / f"frames_{chunk:05d}.npy", root / f"meta_{chunk:05d}.npy"
+
+
+class FrameRecorder:
+    """
+    Write frames plus metadata into chunked memory-mapped files.
+
+    Parameters
+    ----------
+    path : str | Path
+        Target directory (created if missing).
+    chunk_frames : int
+        Frames per chunk file. Larger chunks mean fewer files; smaller chunks
+        limit the size of the last, partially filled chunk.
+    overwrite : bool
+        Allow writing into a directory that already holds a recording.
+
+    The frame shape and dtype are fixed by the first frame. Use as a context
+    manager or call close() so the index file is complete; ``write`` can be
+    passed directly as a stream callback.
+    """
+
+    def __init__(self, path: str | Path, *, chunk_frames: int = 256, overwrite: bool = False) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        if (self.path / _INDEX_FILE).exists() and not overwrite:
+            raise FileExistsError(f"Recording already exists: {self.path}")
+        self.chunk_frames = max(1, int(chunk_frames))
+        self._lock = threading.Lock()
+        self._shape: Optional[tuple[int, ...]] = None
+        self._dtype: Optional[np.dtype] = None
+        self._chunk = -1
+        self._pos = 0
+        self._frames = None
+        self._meta = None
+        self._chunk_counts: list[int] = []
+        self._count = 0
+        self._closed = False
+
+    def __enter__(self) -> "FrameRecorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _open_chunk(self) -> None:
+        self._flush_chunk()
+        self._chunk += 1
+        self._pos = 0
+        frames_path, meta_path = _chunk_paths(self.path, self._chunk)
+        self._frames = np.lib.format.open_memmap(
+            frames_path, mode="w+", dtype=self._dtype, shape=(self.chunk_frames, *self._shape)
+        )
+        self._meta = np.lib.format.open_memmap(meta_path, mode="w+", dtype=META_DTYPE, shape=(self.chunk_frames,))
+        self._chunk_counts.append(0)
+
+    def _flush_chunk(self) -> None:
+        if self._frames is not None:
+            self._frames.flush()
+            self._meta.flush()
+            self._frames = None
+            self._meta = None
+
+    def write(
+        self,
+        frame: np.ndarray,
+        *,
+        timestamp: float | None = None,
+        exposure_us: float | None = None,
+        stage_pos: Sequence[float] | None = None,
+    ) -> int:
+        """
+        Append a frame and return its index in the recording.
+
+        Parameters
+        ----------
+        frame : numpy.ndarray
+            Raw frame; must match the shape and dtype of the first frame.
+        timestamp : float, optional
+            Acquisition time in seconds (default: time.monotonic()).
+        exposure_us : float, optional
+            Exposure time in microseconds (NaN if unknown).
+        stage_pos : sequence of float, optional
+            Up to three stage coordinates (x, y, z); missing values are NaN.
+        """
+        frame = np.asarray(frame)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("FrameRecorder is closed")
+            if self._shape is None:
+                self._shape = tuple(frame.shape)
+                self._dtype = frame.dtype
+            elif frame.shape != self._shape or frame.dtype != self._dtype:
+                raise ValueError(
+                    f"Frame {frame.shape}/{frame.dtype} does not match recording {self._shape}/{self._dtype}"
+                )
+            if self._frames is None or self._pos >= self.chunk_frames:
+                self._open_chunk()
+            self._frames[self._pos] = frame
+            pos = (list(stage_pos) if stage_pos is not None else []) + [np.nan] * 3
+            self._meta[self._pos] = (
+                self._count,
+                time.monotonic() if timestamp is None else float(timestamp),
+                np.nan if exposure_us is None else float(exposure_us),
+                float(pos[0]),
+                float(pos[1]),
+                float(pos[2]),
+            )
+            self._pos += 1
+            self._chunk_counts[-1] = self._pos
+            self._count += 1
+            return self._count - 1
+
+    def close(self) -> None:
+        """Flush the last chunk and write the index file."""
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_chunk()
+            index = {
+                "version": 1,
+                "dtype": None if self._dtype is None else self._dtype.str,
+                "shape": None if self._shape is None else list(self._shape),
+                "chunk_frames": self.chunk_frames,
+                "chunk_counts": self._chunk_counts,
+                "frames": self._count,
+            }
+            (self.path / _INDEX_FILE).write_text(json.dumps(index, indent=2), encoding="utf-8")
+            self._closed = True
+
+
+class FrameRecording:
+    """
+    Read-only view of a recording made with FrameRecorder.
+
+    Frames are served straight from the memory-mapped chunks; nothing is
+    loaded until it is accessed.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        index = json.loads((self.path / _INDEX_FILE).read_text(encoding="utf-8"))
+        self.chunk_frames = int(index["chunk_frames"])
+        self._counts = [int(c) for c in index["chunk_counts"]]
+        self.shape = tuple(index["shape"]) if index["shape"] is not None else None
+        self.dtype = np.dtype(index["dtype"]) if index["dtype"] is not None else None
+        self._frames = []
+        metas = []
+        for chunk, count in enumerate(self._counts):
+            frames_path, meta_path = _chunk_paths(self.path, chunk)
+            self._frames.append(np.load(frames_path, mmap_mode="r")[:count])
+            metas.append(np.load(meta_path)[:count])
+        self.metadata = np.concatenate(metas) if metas else np.zeros(0, dtype=META_DTYPE)
+
+    def __len__(self) -> int:
+        return int(self.metadata.shape[0])
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(i)
+        chunk, pos = divmod(int(i), self.chunk_frames)
+        return self._frames[chunk][pos]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.metadata["timestamp"]
+
+    def chunks(self) -> Iterator[tuple[int, np.ndarray]]:
+        """Yield (first_index, memmap stack) per chunk, without copying."""
+        start = 0
+        for frames in self._frames:
+            yield start, frames
+            start += frames.shape[0]
+
+    def stack(self, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """Return frames [start, stop) as one (N, H, W[, C]) array (copies across chunks)."""
+        stop = len(self) if stop is None else min(int(stop), len(self))
+        if start == 0 and stop == len(self) and len(self._frames) == 1:
+            return self._frames[0]
+        out = np.empty((max(0, stop - start), *self.shape), dtype=self.dtype)
+        for i in range(start, stop):
+            out[i - start] = self[i]
+        return out
+
+
+REPLAY_REALTIME = "realtime"
+REPLAY_FAST = "fast"
+REPLAY_STEP = "step"
+REPLAY_MODES = (REPLAY_REALTIME, REPLAY_FAST, REPLAY_STEP)
+
+
+class ReplayCamera:
+    """
+    Camera backend that replays a FrameRecording.
+
+    Modes
+    -----
+    - ``"realtime"``: the frame returned is the one that was current at the
+      same time offset in the original session.
+    - ``"fast"``: every call returns the next frame (as fast as possible).
+    - ``"step"``: the current frame is returned until step() is called.
+
+    With loop=True the recording restarts at the end; otherwise the last
+    frame is repeated (fast/step) or held (realtime).
+    """
+
+    def __init__(self, recording: FrameRecording | str | Path, *, mode: str = REPLAY_REALTIME, loop: bool = True) -> None:
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"unknown replay mode {mode!r}; expected one of {REPLAY_MODES}")
+        self.recording = recording if isinstance(recording, FrameRecording) else FrameRecording(recording)
+        if len(self.recording) == 0:
+            raise ValueError("Recording contains no frames")
+        self.mode = mode
+        self.loop = bool(loop)
+        self._lock = threading.Lock()
+        self._index = 0
+        self._t0: float | None = None
+        ts = self.recording.timestamps
+        self._offsets = ts - ts[0]
+        self._duration = float(self._offsets[-1]) if len(ts) > 1 else 0.0
+
+    # ---- lifecycle (PCO-style) -------------------------------------------
+    def start(self) -> None:
+        if self._t0 is None:
+            self._t0 = time.monotonic()
+
+    def stop(self) -> None:
+        self._t0 = None
+
+    def shutdown(self) -> None:
+        self.stop()
+
+    def release(self) -> None:
+        self.stop()
+
+    # ---- replay control --------------------------------------------------
+    def step(self, n: int = 1) -> int:
+        """Advance by n frames (step mode) and return the new index."""
+        with self._lock:
+            self._index = self._wrap(self._index + int(n))
+            return self._index
+
+    def seek(self, index: int) -> None:
+        with self._lock:
+            self._index = self._wrap(int(index))
+            if self.mode == REPLAY_REALTIME:
+                self._t0 = time.monotonic() - float(self._offsets[self._index])
+
+    def _wrap(self, index: int) -> int:
+        n = len(self.recording)
+        if self.loop:
+            return index % n
+        return max(0, min(n - 1, index))
+
+    def _current_index(self) -> int:
+        if self.mode == REPLAY_REALTIME:
+            self.start()
+            elapsed = time.monotonic() - self._t0
+            if self._duration > 0:
+                elapsed = elapsed % self._duration if self.loop else min(elapsed, self._duration)
+            return int(np.searchsorted(self._offsets, elapsed, side="right") - 1)
+        if self.mode == REPLAY_FAST:
+            index = self._index
+            self._index = self._wrap(self._index + 1)
+            return index
+        return self._index
+
+    def get_frame_with_number(self):
+        """Return (frame, recording_index)."""
+        with self._lock:
+            index = self._current_index()
+        # Copy out of the read-only memmap so callers may draw on the frame.
+        return np.array(self.recording[index]), index
+
+    def get_frame(self) -> np.ndarray:
+        return self.get_frame_with_number()[0]
+
+    def get_image_number(self) -> int:
+        with self._lock:
+            if self.mode == REPLAY_REALTIME:
+                return self._current_index()
+            return self._index
+
+    def get_metadata(self, index: int) -> dict:
+        row = self.recording.metadata[index]
+        return {name: row[name].item() for name in META_DTYPE.names}
+
+    # ---- compatibility with the real backends ----------------------------
+    def aquise_frame(self, timeout_ms: int = 50) -> np.ndarray:
+        return self.get_frame()
+
+    def capture_image(self) -> np.ndarray:
+        return self.get_frame()
+
+    def get_exposure_s(self) -> float | None:
+        exposure = float(self.recording.metadata["exposure_us"][0])
+        return None if np.isnan(exposure) else exposure / 1e6
+
+    def set_exposure_ms(self, exposure_ms) -> None:
+        return None
+
+    def get_exposure_limits_s(self):
+        return None
+
+    def get_recorded_count(self) -> int:
+        return len(self.recording)
+
+
+__all__ = [
+    "META_DTYPE",
+    "FrameRecorder",
+    "FrameRecording",
+    "ReplayCamera",
+    "REPLAY_REALTIME",
+    "REPLAY_FAST",
+    "REPLAY_STEP",
+    "REPLAY_MODES",
+]
@@ -0,0 +1,250 @@
+"""Bounded frame hand-off between a camera grab loop and callback workers.
+
+A single grab thread pulls frames from the camera and puts them into a
+bounded queue; a small worker pool runs the user callback. When callbacks are
+slower than the sensor, the queue policy decides what happens:
+
+- ``"drop_oldest"``: discard the oldest queued frame (lowest latency)
+- ``"drop_newest"``: discard the frame that was just grabbed
+- ``"block"``: the grab loop waits for space (no drops, latency grows up to
+  ``queue_size`` frames)
+
+Grab errors back off exponentially; after ``max_grab_errors`` consecutive
+errors the stream stops itself and reports the last error.
+"""
+
+from __future__ import annotations
+
+import collections
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+# Upper bucket edges in milliseconds for the latency histograms.
+LATENCY_BUCKETS_MS = (1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0, 1000.0, float("inf"))
+
+
+class FrameStream(threading.Event):
+    """
+    Background frame stream with a bounded queue and a callback worker pool.
+
+    The object is a ``threading.Event``: calling ``set()`` (or ``stop()``)
+    ends the stream, so it is a drop-in replacement for the stop event that
+    ``IdsCam.start_stream`` used to return.
+
+    Parameters
+    ----------
+    grab : callable
+        Returns the next frame; may block. Exceptions are counted as grab
+        errors; the loop waits `error_backoff_s` (doubled per consecutive
+        error, at most `max_backoff_s`) and tries again.
+    callback : callable
+        Called as callback(frame) from a worker thread.
+    queue_size : int
+        Maximum number of frames waiting for a worker.
+    policy : str
+        One of POLICIES, applied when the queue is full.
+    workers : int
+        Number of callback threads. With more than one worker, callbacks may
+        run concurrently and complete out of order.
+    interval_s : float
+        Optional sleep between grabs (0.0 = as fast as possible).
+    max_grab_errors : int
+        Stop the stream after this many consecutive grab errors (0 = never).
+        The exception is kept in `error` and passed to `on_error`.
+    on_error : callable, optional
+        Called as on_error(exc) from the grab thread when the stream stops
+        because of grab errors.
+    """
+
+    def __init__(
+        self,
+        grab: Callable[[], Optional[np.ndarray]],
+        callback: Callable[[np.ndarray], None],
+        *,
+        queue_size: int = 2,
+        policy: str = DROP_OLDEST,
+        workers: int = 1,
+        interval_s: float = 0.0,
+        error_backoff_s: float = 0.01,
+        max_backoff_s: float = 0.5,
+        max_grab_errors: int = 20,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        name: str = "FrameStream",
+    ) -> None:
+        super().__init__()
+        if policy not in POLICIES:
+            raise ValueError(f"unknown queue policy {policy!r}; expected one of {POLICIES}")
+        self._grab = grab
+        self._callback = callback
+        self.queue_size = max(1, int(queue_size))
+        self.policy = policy
+        self.interval_s = max(0.0, float(interval_s))
+        self.error_backoff_s = max(0.0, float(error_backoff_s))
+        self.max_backoff_s = max(self.error_backoff_s, float(max_backoff_s))
+        self.max_grab_errors = max(0, int(max_grab_errors))
+        self._on_error = on_error
+        self.error: Optional[BaseException] = None
+        self.name = name
+        self._queue: collections.deque = collections.deque()
+        self._qcond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._n_workers = max(1, int(workers))
+
+        self._grabbed = 0
+        self._delivered = 0
+        self._dropped = 0
+        self._grab_errors = 0
+        self._callback_errors = 0
+        self._max_depth = 0
+        self._callback_hist = [0] * len(LATENCY_BUCKETS_MS)
+        self._latency_hist = [0] * len(LATENCY_BUCKETS_MS)
+        self._delivery_times: collections.deque = collections.deque(maxlen=64)
+
+    # ---- lifecycle -------------------------------------------------------
+    def start(self) -> "FrameStream":
+        """Start the grab thread and the callback workers."""
+        if self._threads:
+            return self
+        grabber = threading.Thread(target=self._grab_loop, name=f"{self.name}-grab", daemon=True)
+        self._threads.append(grabber)
+        for i in range(self._n_workers):
+            self._threads.append(
+                threading.Thread(target=self._worker_loop, name=f"{self.name}-worker{i}", daemon=True)
+            )
+        for t in self._threads:
+            t.start()
+        return self
+
+    def set(self) -> None:
+        """Stop the stream; queued frames that were not delivered are discarded."""
+        super().set()
+        with self._qcond:
+            self._queue.clear()
+            self._qcond.notify_all()
+
+    def stop(self, timeout: float | None = 1.0) -> None:
+        """Stop the stream and wait up to `timeout` seconds for the threads."""
+        self.set()
+        for t in self._threads:
+            if t is not threading.current_thread():
+                t.join(timeout)
+
+    # ---- threads ---------------------------------------------------------
+    def _grab_loop(self) -> None:
+        consecutive = 0
+        while not self.is_set():
+            try:
+                frame = self._grab()
+            except Exception as exc:
+                consecutive += 1
+                with self._qcond:
+                    self._grab_errors += 1
+                    self.error = exc
+                if self.max_grab_errors and consecutive >= self.max_grab_errors:
+                    print(f"{self.name}: {consecutive} Grab-Fehler in Folge, Stream gestoppt: {exc!r}")
+                    self.set()
+                    if self._on_error is not None:
+                        self._on_error(exc)
+                    return
+                self.wait(min(self.max_backoff_s, self.error_backoff_s * 2 ** (consecutive - 1)))
+                continue
+            consecutive = 0
+            if frame is None:
+                continue
+            self._put(frame, time.monotonic())
+            if self.interval_s > 0:
+                self.wait(self.interval_s)
+
+    def _put(self, frame: np.ndarray, t_grab: float) -> None:
+        with self._qcond:
+            self._grabbed += 1
+            if len(self._queue) >= self.queue_size:
+                if self.policy == DROP_NEWEST:
+                    self._dropped += 1
+                    return
+                if self.policy == DROP_OLDEST:
+                    self._queue.popleft()
+                    self._dropped += 1
+                else:
+                    while len(self._queue) >= self.queue_size and not self.is_set():
+                        self._qcond.wait(0.1)
+                    if self.is_set():
+                        return
+            self._queue.append((frame, t_grab))
+            self._max_depth = max(self._max_depth, len(self._queue))
+            self._qcond.notify_all()
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._qcond:
+                while not self._queue and not self.is_set():
+                    self._qcond.wait(0.1)
+                if self.is_set():
+                    return
+                frame, t_grab = self._queue.popleft()
+                # Wake a grab loop blocked on a full queue.
+                self._qcond.notify_all()
+            t0 = time.monotonic()
+            ok = True
+            try:
+                self._callback(frame)
+            except Exception:
+                ok = False
+            t1 = time.monotonic()
+            with self._qcond:
+                if ok:
+                    self._delivered += 1
+                    self._delivery_times.append(t1)
+                else:
+                    self._callback_errors += 1
+                self._callback_hist[_bucket_index((t1 - t0) * 1000.0)] += 1
+                self._latency_hist[_bucket_index((t1 - t_grab) * 1000.0)] += 1
+
+    # ---- statistics ------------------------------------------------------
+    def stats(self) -> dict:
+        """
+        Return a snapshot of the stream statistics.
+
+        Keys: grabbed, delivered, dropped, grab_errors, last_error (repr or
+        None), stopped (stream ended), callback_errors, queue_depth,
+        max_queue_depth, delivered_fps (over the last 64 deliveries),
+        callback_ms_hist and latency_ms_hist (grab to callback end).
+        Histograms map the upper bucket edge in ms to a count.
+        """
+        with self._qcond:
+            times = list(self._delivery_times)
+            fps = 0.0
+            if len(times) >= 2 and times[-1] > times[0]:
+                fps = (len(times) - 1) / (times[-1] - times[0])
+            return {
+                "grabbed": self._grabbed,
+                "delivered": self._delivered,
+                "dropped": self._dropped,
+                "grab_errors": self._grab_errors,
+                "last_error": repr(self.error) if self.error is not None else None,
+                "stopped": self.is_set(),
+                "callback_errors": self._callback_errors,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_depth,
+                "delivered_fps": fps,
+                "callback_ms_hist": dict(zip(LATENCY_BUCKETS_MS, self._callback_hist)),
+                "latency_ms_hist": dict(zip(LATENCY_BUCKETS_MS, self._latency_hist)),
+            }
+
+
+def _bucket_index(value_ms: float) -> int:
+    for i, edge in enumerate(LATENCY_BUCKETS_MS):
+        if value_ms <= edge:
+            return i
+    return len(LATENCY_BUCKETS_MS) - 1
+
+
+__all__ = ["FrameStream", "DROP_OLDEST", "DROP_NEWEST", "BLOCK", "POLICIES", "LATENCY_BUCKETS_MS"]
@@ -3,13 +3,17 @@
 from __future__ import annotations
 
 import ctypes
+import json
 import logging
-import time
+import os
 import threading
-from typing import Optional
+from pathlib import Path
+from typing import Dict, Optional, Tuple
 
 import numpy as np
 
+from ie_Framework.Hardware.Camera.frame_stream import DROP_OLDEST, FrameStream
+
 """
 Requires the IDS peak SDK (including the Python bindings) to be installed
 for real camera operation: https://en.ids-imaging.com/ids-peak-sdk.html
@@ -23,6 +27,91 @@ except Exception as exc:
     IDS_PEAK_AVAILABLE = False
     IDS_PEAK_IMPORT_ERROR = exc
 
+# Capabilities of cameras seen before (per serial number), so limits can be
+# shown without opening a device. Override the file with IE_IDS_CAPABILITIES.
+CAPABILITY_CACHE_PATH = Path(
+    os.environ.get("IE_IDS_CAPABILITIES", str(Path.home() / ".ie_framework" / "ids_capabilities.json"))
+)
+# Session state, not properties of the camera: kept in memory, never written
+# to the file (the device index can change between sessions as well).
+RUNTIME_KEYS = ("exposure_us", "index")
+_capabilities: Optional[Dict[str, dict]] = None
+_capabilities_lock = threading.Lock()
+
+
+def _load_capabilities() -> Dict[str, dict]:
+    global _capabilities
+    if _capabilities is None:
+        try:
+            _capabilities = json.loads(CAPABILITY_CACHE_PATH.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            _capabilities = {}
+        except Exception as exc:
+            logging.warning(f"IDS capability cache unreadable: {exc}")
+            _capabilities = {}
+    return _capabilities
+
+
+def device_identity(index: int) -> Optional[Tuple[str, str]]:
+    """(model, serial) of the device at `index` from the device list, without opening it."""
+    if _ids_peak is None:
+        return None
+    try:
+        _ids_peak.Library.Initialize()
+        dm = _ids_peak.DeviceManager.Instance()
+        dm.Update()
+        desc = dm.Devices()[int(index)]
+        return str(desc.ModelName()), str(desc.SerialNumber())
+    except Exception:
+        return None
+
+
+def cached_capabilities(index: int, serial: Optional[str] = None) -> Optional[dict]:
+    """
+    Capabilities last reported by the camera now at `index` (None if never seen).
+
+    Without `serial` the device list is asked which camera sits at `index`;
+    an entry is only returned if model and serial match.
+    """
+    model = None
+    if serial is None:
+        identity = device_identity(index)
+        if identity is None:
+            return None
+        model, serial = identity
+    with _capabilities_lock:
+        caps = _load_capabilities().get(str(serial))
+        if caps is None or str(caps.get("serial")) != str(serial):
+            return None
+        if model is not None and str(caps.get("model")) != model:
+            return None
+        caps = dict(caps)
+    caps["index"] = int(index)
+    return caps
+
+
+def store_capabilities(caps: dict, *, persist: bool = True) -> None:
+    """Remember `caps` under its serial number; dummy cameras are never cached."""
+    serial = caps.get("serial")
+    if caps.get("dummy") or not serial:
+        return
+    with _capabilities_lock:
+        cache = _load_capabilities()
+        cache[str(serial)] = dict(caps)
+        if not persist:
+            return
+        # Entries of the old per-index layout (key != serial) are dropped.
+        stored = {
+            key: {k: v for k, v in entry.items() if k not in RUNTIME_KEYS}
+            for key, entry in cache.items()
+            if str(entry.get("serial")) == key
+        }
+        try:
+            CAPABILITY_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            CAPABILITY_CACHE_PATH.write_text(json.dumps(stored, indent=2), encoding="utf-8")
+        except Exception as exc:
+            logging.warning(f"IDS capability cache not written: {exc}")
+
 
 class IdsCam:
     """
@@ -254,6 +343,61 @@ class IdsCam:
             "pixel_format": self.pixel_format,
         }
 
+    def _node_range(self, name: str):
+        try:
+            node = self.remote.FindNode(name)
+            return float(node.Minimum()), float(node.Maximum())
+        except Exception:
+            return None
+
+    def get_capabilities(self) -> dict:
+        """
+        Return what the open session knows about the camera.
+
+        Keys: model info (see get_model_info), ``index``, ``dummy``,
+        ``pixel_format`` and ``pixel_formats``, ``exposure_us`` (current)
+        and ``exposure_range_us``, ``gain_range`` (None if the camera has no
+        gain node), ``sensor_size`` (maximum width, height),
+        ``resolution`` and ``pixel_size_um``. Only node values are read;
+        acquisition is not touched. Values are JSON serialisable;
+        ``index`` and ``exposure_us`` are session state (RUNTIME_KEYS) and
+        are not written to the capability file.
+        """
+        caps = dict(self.get_model_info())
+        cur, mn, mx = self.get_exposure_limits_us()
+        caps.update(
+            {
+                "index": self.index,
+                "dummy": bool(self._dummy or self.remote is None),
+                "exposure_us": cur,
+                "exposure_range_us": [mn, mx],
+                "resolution": [int(self.width), int(self.height)],
+                "pixel_size_um": None if self.pixel_size_um is None else float(self.pixel_size_um),
+            }
+        )
+        if caps["dummy"]:
+            caps.update(
+                {"pixel_formats": [self.pixel_format], "gain_range": None, "sensor_size": caps["resolution"]}
+            )
+            return caps
+        try:
+            formats = sorted(e.SymbolicValue() for e in self.remote.FindNode("PixelFormat").Entries())
+        except Exception:
+            formats = [self.pixel_format]
+        gain = self._node_range("Gain")
+        width = self._node_range("Width")
+        height = self._node_range("Height")
+        caps.update(
+            {
+                "pixel_formats": formats,
+                "gain_range": None if gain is None else list(gain),
+                "sensor_size": (
+                    [int(width[1]), int(height[1])] if width and height else caps["resolution"]
+                ),
+            }
+        )
+        return caps
+
     def aquise_frame(self, timeout_ms: int = 50) -> np.ndarray:
         """
         Capture a single frame.
@@ -279,38 +423,62 @@ class IdsCam:
         self.ds.QueueBuffer(buf)
         return frame
 
-    def start_stream(self, callback, interval_s: float = 0.0) -> threading.Event:
+    def start_stream(
+        self,
+        callback,
+        interval_s: float = 0.0,
+        *,
+        queue_size: int = 2,
+        policy: str = DROP_OLDEST,
+        workers: int = 1,
+        timeout_ms: int = 50,
+        on_error=None,
+    ) -> FrameStream:
         """
-        Start a simple live acquisition loop that calls `callback(frame)`.
+        Start a live acquisition stream that calls `callback(frame)`.
 
-        This runs in a background thread and works for both real camera
-        and dummy mode.
+        Frames are grabbed in a background thread and handed to a worker
+        pool through a bounded queue, so a slow callback never starves the
+        camera buffers. Works for both real camera and dummy mode.
 
         Parameters
         ----------
         callback : callable
-            Function that will be called as callback(frame) for each frame.
+            Function that will be called as callback(frame) for each
+            delivered frame (from a worker thread).
         interval_s : float
             Optional sleep time between frames in seconds
             (0.0 = as fast as possible).
+        queue_size : int
+            Maximum number of frames waiting for a worker.
+        policy : str
+            Behaviour when the queue is full: "drop_oldest" (default, lowest
+            latency), "drop_newest" or "block".
+        workers : int
+            Number of callback worker threads.
+        timeout_ms : int
+            Buffer wait timeout passed to aquise_frame().
+        on_error : callable, optional
+            Called as on_error(exc) when the stream stops after repeated
+            grab errors (see FrameStream.max_grab_errors).
 
         Returns
         -------
-        threading.Event
-            Event that can be set() to stop the stream.
+        FrameStream
+            threading.Event subclass; set() stops the stream and stats()
+            reports delivered fps, drops, queue depth and latency histograms.
         """
-        stop_event = threading.Event()
-
-        def _loop():
-            while not stop_event.is_set():
-                frame = self.aquise_frame()
-                callback(frame)
-                if interval_s > 0:
-                    time.sleep(interval_s)
-
-        t = threading.Thread(target=_loop, daemon=True)
-        t.start()
-        return stop_event
+        stream = FrameStream(
+            lambda: self.aquise_frame(timeout_ms=timeout_ms),
+            callback,
+            queue_size=queue_size,
+            policy=policy,
+            workers=workers,
+            interval_s=interval_s,
+            on_error=on_error,
+            name=f"IdsCam{self.index}",
+        )
+        return stream.start()
 
     def shutdown(self) -> None:
         """
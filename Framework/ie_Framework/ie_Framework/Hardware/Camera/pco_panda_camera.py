@@ -1,3 +1,5 @@
+import time
+
 import pco
 from pco import defs
 
@@ -52,6 +54,70 @@ class PcoCameraBackend:
         image, _meta = self._cam.image(defs.PCO_RECORDER_LATEST_IMAGE)
         return image
 
+    def get_image_number(self):
+        """Return the recorder's image counter, or None if it cannot be read.
+
+        The counter only advances when the camera delivers a new image, so
+        comparing it against a previously seen value tells whether
+        get_frame() would return a duplicate without touching pixel data.
+        """
+        return self.get_recorded_count()
+
+    def get_frame_with_number(self):
+        """Return (image, image_number) of the latest recorded image.
+
+        The counter is read before and after the transfer; if a new image
+        arrived in between, the read is repeated so the number always
+        belongs to the returned image. Returns (None, None) when stopped.
+        """
+        if self._cam is None:
+            return None, None
+        image = None
+        number = self.get_image_number()
+        for _ in range(3):
+            image, meta = self._cam.image(defs.PCO_RECORDER_LATEST_IMAGE)
+            after = self.get_image_number()
+            if after == number:
+                break
+            number = after
+        if number is None:
+            number = _meta_image_number(meta)
+        return image, number
+
+    def wait_for_frame(self, newer_than=None, timeout_s: float = 1.0, poll_s: float = 0.002):
+        """Block until an image newer than `newer_than` is recorded.
+
+        Parameters
+        ----------
+        newer_than : int | None
+            Last image number the caller has seen. None returns the latest
+            image immediately.
+        timeout_s : float
+            Maximum time to wait for a new image.
+        poll_s : float
+            Sleep between counter polls.
+
+        Returns
+        -------
+        tuple
+            (image, image_number), or (None, newer_than) on timeout.
+        """
+        if self._cam is None:
+            return None, newer_than
+        if newer_than is None:
+            return self.get_frame_with_number()
+        deadline = time.monotonic() + max(0.0, float(timeout_s))
+        while True:
+            number = self.get_image_number()
+            if number is None:
+                # Counter not available: fall back to the plain latest image.
+                return self.get_frame_with_number()
+            if number > newer_than:
+                return self.get_frame_with_number()
+            if time.monotonic() >= deadline:
+                return None, newer_than
+            time.sleep(poll_s)
+
     def get_exposure_s(self):
         if self._cam is None:
             return None
@@ -82,3 +148,17 @@ class PcoCameraBackend:
             return int(self._cam.recorded_image_count)
         except Exception:
             return None
+
+
+def _meta_image_number(meta):
+    """Extract the recorder image number from pco image metadata, if present."""
+    if not isinstance(meta, dict):
+        return None
+    for key in ("recorder image number", "image number", "image_number"):
+        value = meta.get(key)
+        if value is not None:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+    return None
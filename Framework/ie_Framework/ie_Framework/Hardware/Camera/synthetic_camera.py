@@ -0,0 +1,310 @@
+"""Synthetic camera backend with realistic scenes and exact ground truth.
+
+Used to load-test and benchmark everything downstream of acquisition on a
+developer machine. Each frame comes with the ground truth that generated it.
+
+Scenes
+------
+- ``"laser_spot"``: Gaussian laser spot drifting on a flat background
+  (truth: ``x``, ``y``, ``sigma``)
+- ``"particles"``: bright particles on a sinusoidal grating
+  (truth: ``particles`` as an (N, 3) array of cx, cy, diameter)
+- ``"grating_shift"``: grating whose phase advances every frame like a piezo
+  shift stack (truth: ``angle_deg``, ``pitch_px``, ``shift_px``)
+- ``"line_laser"``: straight laser line with Gaussian profile
+  (truth: ``angle_deg``, ``width_px``, ``x``, ``y``)
+
+Noise model: photon shot noise (Poisson via Gaussian approximation), read
+noise, quantisation to the configured bit depth and optional hot pixels.
+The backend offers the method names of the IDS, PCO and DinoLite wrappers so
+it can stand in for any of them.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+SCENES = ("laser_spot", "particles", "grating_shift", "line_laser")
+
+
+class SyntheticCamera:
+    """
+    Camera backend generating synthetic frames at a target frame rate.
+
+    Parameters
+    ----------
+    scene : str
+        One of SCENES.
+    width, height : int
+        Frame size in pixels.
+    fps : float
+        Target frame rate; grabs block to keep it (0 = unthrottled).
+    bit_depth : int
+        8 returns uint8 frames, 10..16 return uint16 frames.
+    read_noise : float
+        Read noise standard deviation in digital numbers.
+    gain : float
+        Digital numbers per photo-electron; controls shot noise.
+    hot_pixel_fraction : float
+        Fraction of pixels stuck at full scale.
+    seed : int | None
+        Seed for a reproducible sequence.
+    **scene_params
+        Scene-specific overrides, e.g. ``sigma``, ``drift_px``,
+        ``n_particles``, ``pitch_px``, ``angle_deg``, ``shift_px_per_frame``,
+        ``width_px``, ``background``, ``amplitude``.
+    """
+
+    def __init__(
+        self,
+        scene: str = "laser_spot",
+        *,
+        width: int = 1280,
+        height: int = 1024,
+        fps: float = 30.0,
+        bit_depth: int = 12,
+        read_noise: float = 2.0,
+        gain: float = 0.5,
+        hot_pixel_fraction: float = 0.0,
+        seed: Optional[int] = None,
+        **scene_params,
+    ) -> None:
+        if scene not in SCENES:
+            raise ValueError(f"unknown scene {scene!r}; expected one of {SCENES}")
+        self.scene = scene
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = float(fps)
+        self.bit_depth = int(bit_depth)
+        self.read_noise = float(read_noise)
+        self.gain = float(gain)
+        self.params = dict(scene_params)
+        self.pixel_size_um = float(self.params.pop("pixel_size_um", 3.45))
+        self.pixel_format = "Mono8" if self.bit_depth <= 8 else f"Mono{self.bit_depth}"
+        self._dtype = np.uint8 if self.bit_depth <= 8 else np.uint16
+        self._full_scale = float((1 << self.bit_depth) - 1)
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._exposure_us = 10000.0
+        self._frame_number = 0
+        self._next_due = 0.0
+        self._running = False
+        self.ground_truth: dict = {}
+        self._dummy = False
+        self._noise_buf: Optional[np.ndarray] = None
+
+        n_hot = int(round(hot_pixel_fraction * self.width * self.height))
+        self._hot = (
+            self._rng.integers(0, self.height, n_hot),
+            self._rng.integers(0, self.width, n_hot),
+        ) if n_hot else None
+        self._static = self._build_static_scene()
+
+    # ---- scene generation ------------------------------------------------
+    def _p(self, key, default):
+        return self.params.get(key, default)
+
+    def _build_static_scene(self) -> Optional[np.ndarray]:
+        """Pre-render the parts of a scene that do not change between frames."""
+        h, w = self.height, self.width
+        if self.scene == "particles":
+            yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+            pitch = float(self._p("pitch_px", 12.0))
+            angle = math.radians(float(self._p("angle_deg", 8.95)))
+            base = float(self._p("background", 0.35))
+            contrast = float(self._p("grating_contrast", 0.15))
+            k = 2.0 * math.pi / pitch
+            img = base + contrast * np.sin(k * (xx * math.cos(angle) + yy * math.sin(angle)))
+            n = int(self._p("n_particles", 60))
+            dmin, dmax = self._p("diameter_range_px", (12.0, 40.0))
+            margin = int(dmax) + 12
+            cx = self._rng.uniform(margin, w - margin, n)
+            cy = self._rng.uniform(margin, h - margin, n)
+            diam = self._rng.uniform(dmin, dmax, n)
+            amp = float(self._p("particle_amplitude", 0.45))
+            for x0, y0, d in zip(cx, cy, diam):
+                r = d / 2.0
+                x1, x2 = int(x0 - r - 3), int(x0 + r + 4)
+                y1, y2 = int(y0 - r - 3), int(y0 + r + 4)
+                dist = np.hypot(xx[y1:y2, x1:x2] - x0, yy[y1:y2, x1:x2] - y0)
+                # Soft edge over ~1 px.
+                img[y1:y2, x1:x2] += amp * np.clip(r + 0.5 - dist, 0.0, 1.0)
+            self._particles = np.column_stack([cx, cy, diam])
+            return np.clip(img, 0.0, 1.0).astype(np.float32)
+        if self.scene in ("grating_shift", "line_laser"):
+            yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+            self._xx = xx - w / 2.0
+            self._yy = yy - h / 2.0
+        return None
+
+    def _render(self, n: int) -> tuple[np.ndarray, dict]:
+        """Return the noise-free image in [0, 1] and the truth for frame n."""
+        h, w = self.height, self.width
+        if self.scene == "laser_spot":
+            sigma = float(self._p("sigma", 6.0))
+            amp = float(self._p("amplitude", 0.8))
+            drift = float(self._p("drift_px", 0.25 * min(h, w)))
+            period = float(self._p("period_frames", 400.0))
+            phase = 2.0 * math.pi * n / period
+            x = w / 2.0 + drift * math.sin(phase)
+            y = h / 2.0 + drift * math.sin(1.7 * phase + 0.4)
+            img = np.full((h, w), float(self._p("background", 0.05)), dtype=np.float32)
+            r = int(math.ceil(5 * sigma))
+            x1, x2 = max(0, int(x) - r), min(w, int(x) + r + 1)
+            y1, y2 = max(0, int(y) - r), min(h, int(y) + r + 1)
+            gx = np.exp(-0.5 * ((np.arange(x1, x2) - x) / sigma) ** 2).astype(np.float32)
+            gy = np.exp(-0.5 * ((np.arange(y1, y2) - y) / sigma) ** 2).astype(np.float32)
+            img[y1:y2, x1:x2] += amp * np.outer(gy, gx)
+            return img, {"x": x, "y": y, "sigma": sigma}
+        if self.scene == "particles":
+            return self._static, {"particles": self._particles.copy()}
+        if self.scene == "grating_shift":
+            pitch = float(self._p("pitch_px", 33.0 / 3.33))
+            angle_deg = float(self._p("angle_deg", 8.95))
+            step = float(self._p("shift_px_per_frame", 0.5))
+            angle = math.radians(angle_deg)
+            shift = step * n
+            k = 2.0 * math.pi / pitch
+            u = self._xx * math.cos(angle) + self._yy * math.sin(angle)
+            img = 0.5 + 0.35 * np.cos(k * (u - shift))
+            return img.astype(np.float32), {"angle_deg": angle_deg, "pitch_px": pitch, "shift_px": shift}
+        # line_laser
+        angle_deg = float(self._p("angle_deg", 2.0))
+        width_px = float(self._p("width_px", 8.0))
+        wobble = float(self._p("wobble_px", 1.0))
+        angle = math.radians(angle_deg)
+        offset = wobble * math.sin(2.0 * math.pi * n / float(self._p("period_frames", 200.0)))
+        # Signed distance from a line through the centre (shifted by offset).
+        d = -self._xx * math.sin(angle) + self._yy * math.cos(angle) - offset
+        sigma = width_px / 2.355
+        img = float(self._p("background", 0.03)) + float(self._p("amplitude", 0.85)) * np.exp(-0.5 * (d / sigma) ** 2)
+        x = w / 2.0 - offset * math.sin(angle)
+        y = h / 2.0 + offset * math.cos(angle)
+        return img.astype(np.float32), {"angle_deg": angle_deg, "width_px": width_px, "x": x, "y": y}
+
+    def _noise_field(self) -> np.ndarray:
+        """Unit Gaussian noise for one frame, freshly drawn (float32 ziggurat)
+        into a reused buffer, so no two frames share noise samples."""
+        if self._noise_buf is None:
+            self._noise_buf = np.empty((self.height, self.width), dtype=np.float32)
+        return self._rng.standard_normal(dtype=np.float32, out=self._noise_buf)
+
+    def _apply_noise(self, img: np.ndarray) -> np.ndarray:
+        scale = self._full_scale * min(4.0, self._exposure_us / 10000.0)
+        signal = img * np.float32(scale)
+        # Shot noise variance = signal * gain (DN), read noise added in quadrature.
+        sigma = np.maximum(signal, 0.0)
+        sigma *= np.float32(self.gain)
+        sigma += np.float32(self.read_noise ** 2)
+        np.sqrt(sigma, out=sigma)
+        sigma *= self._noise_field()
+        signal += sigma
+        np.clip(signal, 0.0, self._full_scale, out=signal)
+        out = np.rint(signal, out=signal).astype(self._dtype)
+        if self._hot is not None:
+            out[self._hot] = int(self._full_scale)
+        return out
+
+    def _next_frame(self) -> tuple[np.ndarray, int, dict]:
+        with self._lock:
+            if self.fps > 0:
+                now = time.monotonic()
+                if self._next_due > now:
+                    time.sleep(self._next_due - now)
+                    now = self._next_due
+                self._next_due = max(self._next_due, now) + 1.0 / self.fps
+            n = self._frame_number
+            img, truth = self._render(n)
+            frame = self._apply_noise(img)
+            truth = dict(truth, frame_number=n, exposure_us=self._exposure_us, timestamp=time.monotonic())
+            self._frame_number += 1
+            self.ground_truth = truth
+            return frame, n, truth
+
+    # ---- generic API -----------------------------------------------------
+    def grab_with_truth(self) -> tuple[np.ndarray, dict]:
+        """Return the next frame and its ground truth."""
+        frame, _n, truth = self._next_frame()
+        return frame, truth
+
+    # ---- IdsCam-style ----------------------------------------------------
+    def aquise_frame(self, timeout_ms: int = 50) -> np.ndarray:
+        return self._next_frame()[0]
+
+    def set_exposure_us(self, us: float) -> None:
+        self._exposure_us = float(max(10.0, min(1_000_000.0, us)))
+
+    def get_exposure_limits_us(self) -> tuple[float, float, float]:
+        return self._exposure_us, 10.0, 1_000_000.0
+
+    def get_pixel_size_um(self) -> float:
+        return self.pixel_size_um
+
+    def get_resolution(self) -> tuple[int, int]:
+        return self.width, self.height
+
+    def get_model_info(self) -> dict:
+        return {
+            "model": f"SYNTHETIC-{self.scene}",
+            "serial": "SYNTHETIC",
+            "id": "SYNTHETIC",
+            "display_name": f"Synthetic {self.scene}",
+            "pixel_format": self.pixel_format,
+        }
+
+    def shutdown(self) -> None:
+        self.stop()
+
+    # ---- PcoCameraBackend-style ------------------------------------------
+    def start(self) -> None:
+        self._running = True
+
+    def stop(self) -> None:
+        self._running = False
+
+    def get_frame(self) -> np.ndarray:
+        return self._next_frame()[0]
+
+    def get_frame_with_number(self):
+        frame, n, _truth = self._next_frame()
+        return frame, n
+
+    def get_image_number(self) -> int:
+        # A new frame is always available once the frame period has passed.
+        if self.fps <= 0 or time.monotonic() >= self._next_due:
+            return self._frame_number
+        return self._frame_number - 1
+
+    def wait_for_frame(self, newer_than=None, timeout_s: float = 1.0, poll_s: float = 0.002):
+        return self.get_frame_with_number()
+
+    def get_exposure_s(self) -> float:
+        return self._exposure_us / 1e6
+
+    def set_exposure_ms(self, exposure_ms) -> None:
+        self.set_exposure_us(float(exposure_ms) * 1000.0)
+
+    def get_exposure_limits_s(self) -> tuple[float, float]:
+        return 10.0 / 1e6, 1.0
+
+    def get_recorded_count(self) -> int:
+        return self._frame_number
+
+    # ---- DinoLite-style --------------------------------------------------
+    def capture_image(self) -> np.ndarray:
+        return self._next_frame()[0]
+
+    def capture_fresh(self, after=None, timeout_s: float = 2.0):
+        frame, n, truth = self._next_frame()
+        return frame, truth["timestamp"], n
+
+    def release(self) -> None:
+        self.stop()
+
+
+__all__ = ["SyntheticCamera", "SCENES"]
@@ -5,15 +5,15 @@ Enthaelt ausschliesslich Framework-Imports und kapselt die IdsCam-/LaserSpot-Log
 from __future__ import annotations
 
 import atexit
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 from pathlib import Path
 import sys
 import time
 
 import cv2
 import numpy as np
-from PySide6.QtCore import QObject, QTimer, Signal, Qt
-from PySide6.QtGui import QImage, QColor, QPainter, QPen
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtGui import QImage
 
 _ROOT = Path(__file__).resolve().parent
 _FW_PACKAGE = _ROOT / "Framework" / "ie_Framework"
@@ -24,7 +24,8 @@ if _FW_PACKAGE.is_dir():
 
 from ie_Framework.Hardware.Camera import ids_camera as _ids_cam_mod
 IdsCam = _ids_cam_mod.IdsCam
-from ie_Framework.Algorithm.laser_spot_detection import LaserSpotDetector
+from ie_Framework.Algorithm.laser_spot_detection import LaserSpotDetector, LaserSpotTracker
+from ie_Framework.UI.frame_view import QImageBuffer, draw_dashed_line, hex_to_rgb, render_frame
 
 _cams: Dict[int, IdsCam] = {}
 
@@ -81,34 +82,67 @@ def _patch_ids_cam_aquise_frame() -> None:
 _patch_ids_cam_aquise_frame()
 
 
-def acquire_frame(device_index: int = 0, timeout_ms: int = 200):
-    """Liefert ein aktuelles Frame der angegebenen IDS-Kamera (mit Cache)."""
+def _get_cam(device_index: int) -> IdsCam:
+    """Open IDS session for `device_index` (one per device, kept in _cams)."""
     cam = _cams.get(device_index)
     if cam is None:
         cam = IdsCam(index=device_index, set_min_exposure=False)
         _cams[device_index] = cam
-    return cam.aquise_frame(timeout_ms=timeout_ms)
+        try:
+            _ids_cam_mod.store_capabilities(cam.get_capabilities())
+        except Exception as exc:
+            print(f"[WARN] Kamera-Eigenschaften nicht lesbar: {exc}")
+    return cam
 
 
-def get_exposure_limits(device_index: int = 0) -> Tuple[int, int, int]:
-    """Gibt aktuelle, minimale und maximale Exposure (in us) zurueck."""
-    cam = IdsCam(index=device_index, set_min_exposure=False)
-    try:
+def acquire_frame(device_index: int = 0, timeout_ms: int = 200):
+    """Liefert ein aktuelles Frame der angegebenen IDS-Kamera (mit Cache)."""
+    return _get_cam(device_index).aquise_frame(timeout_ms=timeout_ms)
+
+
+def get_camera_capabilities(device_index: int = 0) -> dict:
+    """
+    Eigenschaften der Kamera (Exposure-/Gain-Bereich, Pixelformate, Sensorgroesse).
+
+    Aus der offenen Session, sonst aus dem Capability-Cache (nur wenn Modell
+    und Seriennummer der Kamera an `device_index` passen); nur eine nie
+    gesehene Kamera wird geoeffnet (und bleibt fuer die Nutzung offen).
+    Aus dem Cache fehlt ``exposure_us``, solange die Kamera in diesem
+    Prozess nicht offen war.
+    """
+    cam = _cams.get(device_index)
+    if cam is not None:
+        caps = cam.get_capabilities()
+        _ids_cam_mod.store_capabilities(caps, persist=False)
+        return caps
+    caps = _ids_cam_mod.cached_capabilities(device_index)
+    if caps is not None:
+        return caps
+    return _get_cam(device_index).get_capabilities()
+
+
+def get_exposure_limits(device_index: int = 0) -> Tuple[Optional[int], int, int]:
+    """Gibt aktuelle, minimale und maximale Exposure (in us) zurueck (ohne erneutes Oeffnen).
+
+    Die aktuelle Exposure ist None, wenn sie nur aus dem Cache kommen kann
+    und die Kamera in diesem Prozess noch nicht offen war.
+    """
+    cam = _cams.get(device_index)
+    if cam is not None:
         return cam.get_exposure_limits_us()
-    finally:
-        try:
-            cam.shutdown()
-        except Exception:
-            pass
+    caps = get_camera_capabilities(device_index)
+    mn, mx = caps["exposure_range_us"]
+    return caps.get("exposure_us"), mn, mx
 
 
 def set_exposure(device_index: int, exposure_us: int) -> None:
     """Setzt die Exposure; nutzt bestehende Instanz oder legt eine neue an."""
-    cam = _cams.get(device_index)
-    if cam is None:
-        cam = IdsCam(index=device_index, set_min_exposure=False)
-        _cams[device_index] = cam
+    cam = _get_cam(device_index)
     cam.set_exposure_us(int(exposure_us))
+    caps = _ids_cam_mod.cached_capabilities(device_index, cam.get_model_info()["serial"])
+    if caps is not None:
+        caps["exposure_us"] = cam.get_exposure_limits_us()[0]
+        _ids_cam_mod.store_capabilities(caps, persist=False)
 
 
 def shutdown(device_index: int | None = None) -> None:
@@ -136,18 +170,6 @@ def shutdown_all() -> None:
             pass
 
 
-def _ensure_gray8(frame: np.ndarray) -> tuple[np.ndarray, int, int]:
-    """Return (gray_frame_uint8, width, height) for any supported input frame."""
-    if frame.ndim == 3 and frame.shape[2] == 3:
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    if frame.dtype != np.uint8:
-        max_val = float(frame.max() or 1.0)
-        frame = np.clip(frame.astype(np.float32) / max_val * 255.0, 0, 255).astype(np.uint8)
-    gray = np.ascontiguousarray(frame)
-    h, w = gray.shape
-    return gray, w, h
-
-
 def _simulate_dummy_centroid(tick: int, width: int, height: int) -> tuple[int, int]:
     """Pseudo-random moving centroid for dummy mode (mirrors old detector logic)."""
     cx = int(width / 2 + np.sin(tick / 12.0) * (width * 0.25))
@@ -163,10 +185,19 @@ def paint_laser_overlay(
     ref_point: tuple[int, int] | None = None,
     is_dummy: bool = False,
     simulate_fn=None,
+    display_size: tuple[int, int] | None = None,
+    buffer: QImageBuffer | None = None,
 ) -> tuple[QImage, tuple[int, int]]:
-    """Draw laser overlays for a frame and return the QImage plus centroid."""
-    gray, width, height = _ensure_gray8(frame)
-    frame_bytes = gray.tobytes()
+    """Draw laser overlays for a frame and return the QImage plus centroid.
+
+    Detection runs on the full-resolution raw frame (any bit depth), so a
+    LaserSpotTracker only touches its search window. The image is reduced to
+    `display_size` (if given) and normalized to 8 bit before the overlays
+    are drawn. The centroid is always in full-frame pixels. With `buffer` the
+    QImage memory is reused per call.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    height, width = gray.shape
     if is_dummy:
         if simulate_fn is not None:
             cx, cy = simulate_fn(width, height)
@@ -175,54 +206,29 @@ def paint_laser_overlay(
     else:
         cx, cy = detector.detect_laser_spot(gray)
     ref = ref_point
-    qimg = QImage(frame_bytes, width, height, width, QImage.Format_Grayscale8).copy()
-    if qimg.format() != QImage.Format_ARGB32:
-        qimg = qimg.convertToFormat(QImage.Format_ARGB32)
-    painter = QPainter(qimg)
-    try:
-        pen_cam = QPen(QColor(accent_color))
-        pen_cam.setWidth(3)
-        pen_cam.setStyle(Qt.DashLine)
-        painter.setPen(pen_cam)
-        cx0 = width // 2
-        cy0 = height // 2
-        painter.drawLine(cx0, 0, cx0, height)
-        painter.drawLine(0, cy0, width, cy0)
-    except Exception:
-        pass
-    try:
-        pen_l = QPen(QColor(accent_color))
-        pen_l.setWidth(3)
-        pen_l.setCapStyle(Qt.RoundCap)
-        painter.setPen(pen_l)
-        size = max(6, min(width, height) // 20)
-        painter.drawLine(max(0, cx - size), cy, min(width, cx + size), cy)
-        painter.drawLine(cx, max(0, cy - size), cx, min(height, cy + size))
-    except Exception:
-        pass
-    if ref is not None:
-        try:
-            rx, ry = ref
-            pen_r = QPen(QColor("#ffd60a"))
-            pen_r.setWidth(2)
-            painter.setPen(pen_r)
-            rsize = max(6, min(width, height) // 30)
-            painter.drawEllipse(
-                int(rx - rsize // 2),
-                int(ry - rsize // 2),
-                int(rsize),
-                int(rsize),
-            )
-            pen_line = QPen(QColor("#ffd60a"))
-            pen_line.setStyle(Qt.DashLine)
-            painter.setPen(pen_line)
-            painter.drawLine(rx, ry, cx, cy)
-        except Exception:
-            pass
-    try:
-        painter.end()
-    except Exception:
-        pass
+    accent = hex_to_rgb(accent_color)
+    yellow = hex_to_rgb("#ffd60a")
+
+    def _draw(img: np.ndarray, scale: float) -> None:
+        dh, dw = img.shape[:2]
+        thick = max(1, int(round(3 * scale)))
+        dash = max(4, int(round(10 * scale)))
+        draw_dashed_line(img, (dw // 2, 0), (dw // 2, dh), accent, thick, dash)
+        draw_dashed_line(img, (0, dh // 2), (dw, dh // 2), accent, thick, dash)
+        sx, sy = int(round(cx * scale)), int(round(cy * scale))
+        size = max(6, min(dw, dh) // 20)
+        cv2.line(img, (max(0, sx - size), sy), (min(dw, sx + size), sy), accent, thick, cv2.LINE_AA)
+        cv2.line(img, (sx, max(0, sy - size)), (sx, min(dh, sy + size)), accent, thick, cv2.LINE_AA)
+        if ref is not None:
+            rx, ry = int(round(ref[0] * scale)), int(round(ref[1] * scale))
+            rsize = max(6, min(dw, dh) // 30)
+            cv2.circle(img, (rx, ry), rsize // 2, yellow, max(1, thick - 1), cv2.LINE_AA)
+            draw_dashed_line(img, (rx, ry), (sx, sy), yellow, 1, dash)
+
+    qimg, _scale = render_frame(gray, display_size, overlay=_draw, buffer=buffer)
+    if buffer is None:
+        # Caller did not ask for buffer reuse: hand out an independent image.
+        qimg = qimg.copy()
     return qimg, (cx, cy)
 
 
@@ -236,11 +242,18 @@ class LiveLaserController(QObject):
         super().__init__(parent)
         self.device_index = device_index
         self.detector = detector
+        # Per-camera tracking state; detector stays available for callers.
+        self.tracker = LaserSpotTracker()
         self.cam: IdsCam | None = None
         self.is_dummy = False
         self._using_fallback = False
         self._sim_tick = 0
         self._ref_point: tuple[int, int] | None = None
+        # Emitted images are reduced to display_size; frame_size keeps the
+        # full-resolution size the centroid refers to.
+        self.display_size: tuple[int, int] | None = None
+        self.frame_size: tuple[int, int] | None = None
+        self._display_buffer = QImageBuffer()
         self._timeout_ms = 250
         self._timeout_failures = 0
         self._last_init_attempt = 0.0
@@ -253,7 +266,11 @@ class LiveLaserController(QObject):
     def _init_camera(self):
         self._last_init_attempt = time.monotonic()
         try:
-            self.cam = IdsCam(index=self.device_index, set_min_exposure=False)
+            if self.cam is not None and self.is_dummy and not self._using_fallback:
+                # Retry: drop the dummy session so a real camera can be opened
+                shutdown(self.device_index)
+            # Same session as acquire_frame/get_exposure_limits: never opened twice
+            self.cam = _get_cam(self.device_index)
             self.is_dummy = bool(getattr(self.cam, "_dummy", False))
             self._using_fallback = False
             self._last_init_error = None
@@ -286,7 +303,9 @@ class LiveLaserController(QObject):
     def shutdown(self):
         self.stop()
         try:
-            if self.cam is not None:
+            if self.cam is not None and _cams.get(self.device_index) is self.cam:
+                shutdown(self.device_index)
+            elif self.cam is not None:
                 self.cam.shutdown()
         except Exception:
             pass
@@ -303,11 +322,14 @@ class LiveLaserController(QObject):
                 return
             qimg, (cx, cy) = paint_laser_overlay(
                 frame,
-                self.detector,
+                self.tracker,
                 ref_point=self._ref_point,
                 is_dummy=self.is_dummy,
                 simulate_fn=self._next_dummy_centroid if self.is_dummy else None,
+                display_size=self.display_size,
+                buffer=self._display_buffer,
             )
+            self.frame_size = (int(frame.shape[1]), int(frame.shape[0]))
             self.frameReady.emit(qimg)
             self.centerChanged.emit(int(cx), int(cy))
             self._timeout_failures = 0
@@ -401,12 +423,14 @@ atexit.register(shutdown_all)
 
 __all__ = [
     "acquire_frame",
+    "get_camera_capabilities",
     "get_exposure_limits",
     "set_exposure",
     "shutdown",
     "shutdown_all",
     "IdsCam",
     "LaserSpotDetector",
+    "LaserSpotTracker",
     "LiveLaserController",
     "paint_laser_overlay",
 ]
@@ -13,6 +13,7 @@ import os
 import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
 
@@ -21,7 +22,7 @@ import numpy as np
 import matplotlib
 
 matplotlib.use("Agg")  # Offscreen saves only
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import pandas as pd
 import tifffile as tif
 import seaborn as sns
@@ -32,7 +33,9 @@ from pipython import GCSDevice, pitools
 import ie_Framework.Hardware.Motor.EightMotorcontroller as stage_hw
 from ie_Framework.Hardware.Camera.DinoLiteController import DinoLiteController, DummyDinoLite
 from ie_Framework.Algorithm import AngleAnalysisFunctions as AAF
+from ie_Framework.Algorithm.focus_search import FocusSearch
 from ie_Framework.Algorithm.particle_detection import blend_overlay_and_annotate, particle_detection
+from ie_Framework.Utility.artefact_writer import ArtefactWriter
 
 # Von aussen direkt nutzbar
 SingleImageGratingAngle = AAF.SingleImageGratingAngle
@@ -48,6 +51,10 @@ working_distance_dif = 32000
 
 THEORIE_WINKEL_DEG = 8.95
 GRATING_ERROR_TOLERANCE_MRAD = 2
+# Shift-Messung mit streaming=True bricht ab, sobald der Winkel auf diese
+# Unsicherheit bestimmt ist
+SHIFT_CONVERGENCE_MRAD = 0.5
+SHIFT_MIN_FRAMES = 5
 
 SIM7_centerpos = [118395, 154950]
 SIM31_centerpos = [81525, 151110]
@@ -65,9 +72,18 @@ piezoshift_angle_to_cam = 100
 grating_angle_to_cam = 100
 grating_angle_error = 100
 
+# Verlauf der letzten Fokussuche (Position, Score, Phase, Zeit je Messung)
+last_focus_trace: list = []
+
 # Empfindlichkeit fuer Partikeldetektion (0..1)
 DETECTION_SENSITIVITY = 0.66
 
+# Artefakte der Partikelanalyse: "none", "overlay" oder "full"; "tiff" oder "png"
+ARTEFACT_LEVEL = "full"
+ARTEFACT_FORMAT = "tiff"
+_artefact_writer = ArtefactWriter(ARTEFACT_LEVEL, ARTEFACT_FORMAT, max_queue=4)
+atexit.register(_artefact_writer.close)
+
 
 def wait_time(old_pos: float, new_pos: float) -> float:
     """Berechnet die noetige Wartezeit in Sekunden basierend auf dem Weg der Stage."""
@@ -103,16 +119,25 @@ _dpc_device: Optional[GCSDevice] = None
 _dpc_axis: Optional[Any] = None
 
 
-def capture_frame() -> Optional[np.ndarray]:
-    """Liefert ein aktuelles BGR-Frame oder None bei Fehlern."""
+def capture_frame(after: Optional[float] = None) -> Optional[np.ndarray]:
+    """Liefert ein aktuelles BGR-Frame oder None bei Fehlern.
+
+    Das Frame kommt aus dem Hintergrund-Grabber der Kamera (ohne Treiber-
+    Latenz). Mit `after` (time.monotonic()-Zeitstempel, z.B. nach einer
+    Bewegung) wird auf ein Frame gewartet, das danach belichtet wurde.
+    """
     cam = _dino_lite
     if cam is None:
         return None
-    with _camera_lock:
-        try:
-            return cam.capture_image()
-        except Exception:
-            return None
+    try:
+        with _camera_lock:
+            cam.start_grabber()
+        if after is not None:
+            frame, _ts, _seq = cam.capture_fresh(after)
+            return frame
+        return cam.capture_image()
+    except Exception:
+        return None
 
 
 # ---------------------------------------------------------------------------
@@ -123,7 +148,9 @@ def capture_frame() -> Optional[np.ndarray]:
 def _save_particle_plot(df: pd.DataFrame, out_dir: Path):
     if df is None or df.empty:
         return
-    fig, axes = plt.subplots(1, 2, figsize=(12, 4))
+    # Figure statt pyplot: laeuft auch im Artefakt-Thread.
+    fig = Figure(figsize=(12, 4))
+    axes = fig.subplots(1, 2)
     diam = df["equiv_diam_px"]
     sns.histplot(diam, bins=20, kde=False, color="blue", ax=axes[0])
     axes[0].set_title("Histogramm Partikel (px)")
@@ -136,12 +163,25 @@ def _save_particle_plot(df: pd.DataFrame, out_dir: Path):
 
     fig.tight_layout()
     fig.savefig(out_dir / "particle_plot.png", dpi=220)
-    plt.close(fig)
 
 
-def process_image(frame: np.ndarray, *, save_dir: str | Path | None = None, sensitivity: float | None = None) -> Dict[str, Any]:
-    """Partikelanalyse auf einem Frame. Gibt Overlay, Maske, DataFrame und Count zurueck."""
+def process_image(
+    frame: np.ndarray,
+    *,
+    save_dir: str | Path | None = None,
+    sensitivity: float | None = None,
+    artefacts: str | None = None,
+    wait: bool = False,
+) -> Dict[str, Any]:
+    """Partikelanalyse auf einem Frame. Gibt Overlay, Maske, DataFrame und Count zurueck.
+
+    Mit `save_dir` werden die Artefakte im Hintergrund geschrieben
+    (`artefacts`: "none", "overlay" oder "full", Default ARTEFACT_LEVEL);
+    der Aufruf kostet dann nur die Detektion. `wait=True` wartet, bis alle
+    Dateien auf der Platte sind.
+    """
     sensitivity_val = DETECTION_SENSITIVITY if sensitivity is None else sensitivity
+    level = ARTEFACT_LEVEL if artefacts is None else artefacts
     overlay, mask, df, intermediates = particle_detection(
         frame,
         sensitivity=sensitivity_val,
@@ -152,13 +192,14 @@ def process_image(frame: np.ndarray, *, save_dir: str | Path | None = None, sens
 
     if save_dir is not None:
         out = Path(save_dir)
-        out.mkdir(parents=True, exist_ok=True)
-        cv2.imwrite(str(out / "detected.tif"), overlay)
-        cv2.imwrite(str(out / "mask.tif"), mask)
-        df.to_csv(str(out / "particles.csv"), index=False)
-        for key, arr in intermediates.items():
-            cv2.imwrite(str(out / f"{key}.tif"), arr)
-        _save_particle_plot(df, out)
+        _artefact_writer.submit(
+            out,
+            overlay={"detected": overlay, "particles": df},
+            full={**intermediates, "mask": mask, "particle_plot": lambda: _save_particle_plot(df, out)},
+            level=level,
+        )
+        if wait:
+            _artefact_writer.flush()
 
     return {"count": int(len(df)), "overlay": overlay, "mask": mask, "dataframe": df}
 
@@ -184,40 +225,50 @@ def autofocus(
     focus_range: int = 2000,
     step: int = 100,
     settle_s: float = 0.5,
+    strategy: str = "coarse_to_fine",
+    min_step: Optional[int] = None,
+    fit: Optional[str] = "gaussian",
+    metric: str = "laplacian",
+    roi: float = 0.5,
+    level: int = 2,
 ) -> Optional[np.ndarray]:
-    """Autofokus entlang der Z-Achse."""
+    """Autofokus entlang der Z-Achse.
+
+    Sucht mit FocusSearch (Default: grob-fein mit Gauss-Fit) statt eines
+    vollen Rasters; `step` ist die bisherige Rasterweite. Hebt sich im
+    Grobraster kein Peak ab, wird es bis auf `step` verdichtet, damit
+    schmale Peaks wie beim vollen Raster gefunden werden. `min_step`
+    (Default step // 4, bei "sweep" step) die feinste Schrittweite. Gewartet wird, bis die
+    Z-Achse ihr Ziel meldet (sonst `settle_s`). Der Suchverlauf liegt
+    danach in `last_focus_trace`. `metric` ist ein Name aus
+    focus_metrics.METRICS, berechnet auf der Bildmitte (`roi`) in
+    Pyramidenstufe `level`.
+    """
+    global last_focus_trace
     stage = _get_stage_controller()
     try:
         current_z = int(stage.current_pos(z_addr))
     except Exception:
         current_z = 0
-    start = int(current_z - focus_range / 2)
-    end = int(current_z + focus_range / 2)
-
-    best_score = -1.0
-    best_pos = current_z
-    best_frame: Optional[np.ndarray] = None
-
-    for pos in range(start, end + step, step):
-        stage.move_to_pos(z_addr, pos)
-        if settle_s > 0:
-            time.sleep(settle_s)
-        frame = capture_frame()
-        if frame is None:
-            continue
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
-        score = cv2.Laplacian(gray, cv2.CV_64F).var()
-        if score > best_score:
-            best_score = score
-            best_pos = pos
-            best_frame = frame
-
-    if best_pos != current_z:
-        stage.move_to_pos(z_addr, best_pos)
-        if settle_s > 0:
-            time.sleep(settle_s)
-    return best_frame
 
+    search = FocusSearch(
+        lambda pos: stage.move_to_pos(z_addr, int(pos)),
+        capture_frame,
+        is_settled=lambda: stage.reached_pos(z_addr),
+        settle_s=settle_s,
+        metric=metric,
+        roi=roi,
+        level=level,
+    )
+    if min_step is None:
+        min_step = step if strategy == "sweep" else max(1, step // 4)
+    result = search.run(
+        current_z, focus_range, strategy=strategy, min_step=min_step, max_coarse_step=step, fit=fit
+    )
+    last_focus_trace = result["trace"]
+    if result["position"] is None:
+        stage.move_to_pos(z_addr, current_z)
+    return result["frame"]
 
 
 def connect_DPC(start_pos: float = 300.0) -> float:
@@ -277,9 +328,9 @@ def startpos(delay_s: float = 2.0) -> tuple[int, int, int]:
     return startpos_x, startpos_y, startpos_z
 
 
-def acquire_single_frame() -> np.ndarray:
+def acquire_single_frame(after: Optional[float] = None) -> np.ndarray:
     """Nimmt ein einzelnes Frame auf und fasst RGB zu einem Graubild zusammen."""
-    frame = capture_frame()
+    frame = capture_frame(after=after)
     if frame is None:
         raise RuntimeError("Konnte kein Kamerabild aufnehmen")
     if frame.ndim == 3:
@@ -299,13 +350,63 @@ def acquire_shiftstack(um_range: Sequence[float]) -> np.ndarray:
         piezo.MOV(axis, float(um))
         pitools.waitontarget(piezo, [axis])
         time.sleep(0.5)
-        shiftstack[i] = acquire_single_frame()
+        shiftstack[i] = acquire_single_frame(after=time.monotonic())
 
     piezo.MOV(axis, 0.0)
     pitools.waitontarget(piezo, [axis])
     return shiftstack
 
 
+def acquire_shiftstack_streaming(
+    um_range: Sequence[float],
+    analyzer: AAF.ShiftStackAnalyzer,
+    settle_s: float = 0.5,
+    flip_x: bool = False,
+) -> np.ndarray:
+    """Wie acquire_shiftstack, die Auswertung laeuft aber waehrend der Aufnahme.
+
+    Nach jedem Frame wird sofort die naechste Position angefahren; das Frame
+    geht derweil an `analyzer` (ein Worker-Thread). Sobald der Analyzer
+    konvergiert ist, endet die Aufnahme vorzeitig. Liefert die aufgenommenen
+    Frames (mit `flip_x` horizontal gespiegelt, wie sie analysiert wurden).
+    """
+    piezo, axis = _ensure_dpc()
+    positions = [float(um) for um in um_range]
+    frames = []
+    if not positions:
+        return np.zeros((0, 0, 0), dtype=np.uint16)
+
+    piezo.MOV(axis, positions[0])
+    pitools.waitontarget(piezo, [axis])
+    time.sleep(settle_s)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="ShiftAnalysis") as worker:
+        pending = []
+        for i, um in enumerate(positions):
+            frame = acquire_single_frame(after=time.monotonic())
+            if flip_x:
+                frame = np.flip(frame, axis=1)
+            frames.append(frame)
+            if i + 1 < len(positions):
+                piezo.MOV(axis, positions[i + 1])
+            pending.append(worker.submit(analyzer.add, frame, um))
+            # Fehler im Analyzer nicht erst am Ende melden
+            for fut in [f for f in pending if f.done()]:
+                fut.result()
+                pending.remove(fut)
+            if analyzer.converged:
+                print(f"Shift-Winkel nach {len(analyzer)} Frames konvergiert ({analyzer.sigma_mrad:.2f} mrad).")
+                break
+            if i + 1 < len(positions):
+                pitools.waitontarget(piezo, [axis])
+                time.sleep(settle_s)
+        for fut in pending:
+            fut.result()
+
+    piezo.MOV(axis, 0.0)
+    pitools.waitontarget(piezo, [axis])
+    return np.stack(frames)
+
+
 def save_shiftstack(shiftstack: np.ndarray, dirname: str | Path = "Testmeasurement") -> Path:
     """Speichert den Stack als TIF und liefert den Pfad zur Datei."""
     out_dir = Path(dirname)
@@ -332,7 +433,7 @@ def GratingShiftwSave(
     for um in um_range:
         piezo.MOV(axis, float(um))
         pitools.waitontarget(piezo, [axis])
-        frame = capture_frame()
+        frame = capture_frame(after=time.monotonic())
         if frame is None:
             continue
         cv2.imwrite(str(out_dir / f"Voltage_{int(um)}mV.tif"), frame)
@@ -344,8 +445,20 @@ def GratingShiftwSave(
 
 def MeasureShiftFFT(
     um_range: Sequence[float] | np.ndarray = np.arange(0, 300, 10),
+    *,
+    streaming: bool = False,
+    tolerance_mrad: float = SHIFT_CONVERGENCE_MRAD,
+    min_frames: int = SHIFT_MIN_FRAMES,
+    settle_s: float = 0.5,
 ) -> tuple[float, float]:
-    """Piezo-Gitterwinkel ueber FFT-Analyse bestimmen."""
+    """Piezo-Gitterwinkel ueber FFT-Analyse bestimmen.
+
+    Mit `streaming` wird waehrend der Aufnahme ausgewertet und abgebrochen,
+    sobald der Winkel auf `tolerance_mrad` genau ist (mindestens
+    `min_frames` Frames); der Winkel ist dann die Steigungsschaetzung des
+    ShiftStackAnalyzer statt der Endpunkt-Auswertung. Noch nicht am Aufbau
+    validiert, daher nicht Default.
+    """
     connect_DPC()
     stage = _get_stage_controller()
     stage.move_to_pos(z_addr, startpos_z + working_distance_dif)
@@ -354,9 +467,14 @@ def MeasureShiftFFT(
     autofocus()
     time.sleep(2.5)
 
-    shiftstack = acquire_shiftstack(um_range)
-    shiftstack = np.flip(shiftstack, axis=2)
-    piezo_angle, grating_angle = AAF.AnalysePiezoAngleFFT(shiftstack)
+    if streaming:
+        analyzer = AAF.ShiftStackAnalyzer("fft", tolerance_mrad=tolerance_mrad, min_frames=min_frames)
+        acquire_shiftstack_streaming(um_range, analyzer, settle_s=settle_s, flip_x=True)
+        piezo_angle, grating_angle = analyzer.result()
+    else:
+        shiftstack = acquire_shiftstack(um_range)
+        shiftstack = np.flip(shiftstack, axis=2)
+        piezo_angle, grating_angle = AAF.AnalysePiezoAngleFFT(shiftstack)
     update_grating_angle_error(grating_angle, piezo_angle)
     return piezo_angle, grating_angle
 
@@ -365,16 +483,28 @@ def MeasureShiftGratingEdge(
     um_range: Sequence[float] | np.ndarray = np.arange(0, 300, 10),
     shift_dy: int = -150,
     shift_dx: int = -200,
+    *,
+    streaming: bool = False,
+    tolerance_mrad: float = SHIFT_CONVERGENCE_MRAD,
+    min_frames: int = SHIFT_MIN_FRAMES,
+    settle_s: float = 0.5,
 ) -> tuple[float, float]:
-    """Piezo-Gitterwinkel ueber Kantenverschiebung bestimmen."""
+    """Piezo-Gitterwinkel ueber Kantenverschiebung bestimmen (`streaming` wie MeasureShiftFFT)."""
     stage = _get_stage_controller()
     stage.move_to_pos(x_addr, SIM31_SEcornerpos[0])
     time.sleep(2.5)
     stage.move_to_pos(y_addr, SIM31_SEcornerpos[1])
     time.sleep(5)
 
-    shiftstack = acquire_shiftstack(um_range)
-    piezo_angle, grating_angle = AAF.AnalysePiezoAngleGratingEdge(shiftstack, shift_dy, shift_dx)
+    if streaming:
+        analyzer = AAF.ShiftStackAnalyzer(
+            "edge", tolerance_mrad=tolerance_mrad, min_frames=min_frames, shiftDy=shift_dy, shiftDx=shift_dx
+        )
+        acquire_shiftstack_streaming(um_range, analyzer, settle_s=settle_s)
+        piezo_angle, grating_angle = analyzer.result()
+    else:
+        shiftstack = acquire_shiftstack(um_range)
+        piezo_angle, grating_angle = AAF.AnalysePiezoAngleGratingEdge(shiftstack, shift_dy, shift_dx)
     update_grating_angle_error(grating_angle, piezo_angle)
     return piezo_angle, grating_angle
 
@@ -387,7 +517,7 @@ def MeasureSingleImageGratingAngle() -> float:
     stage.move_to_pos(x_addr, SIM31_centerpos[0])
     time.sleep(1)
 
-    single_frame = acquire_single_frame()
+    single_frame = acquire_single_frame(after=time.monotonic())
     angle_deg = SingleImageGratingAngle(single_frame)
     update_grating_angle_error(angle_deg, piezoshift_angle_to_cam)
     return angle_deg
@@ -426,6 +556,7 @@ __all__ = [
     "wait_time",
     "acquire_single_frame",
     "acquire_shiftstack",
+    "acquire_shiftstack_streaming",
     "save_shiftstack",
     "GratingShiftwSave",
     "MeasureShiftFFT",
@@ -0,0 +1,252 @@
+"""Fast conversion of camera frames into display images.
+
+The live views only ever show a few hundred pixels per axis, so frames are
+reduced to the widget size first (``cv2.resize`` with ``INTER_AREA``) and
+everything else - contrast, false colour, overlays - runs on the reduced
+image. Contrast and false colour are folded into a single lookup table, the
+QImage wrapping the result is reused between frames, and ``DisplayPipeline``
+moves the work off the GUI thread onto one worker shared by all views.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Sequence
+
+import cv2
+import numpy as np
+from PySide6.QtCore import QObject, Signal, Slot
+from PySide6.QtGui import QImage, QPixmap
+
+from ie_Framework.Algorithm.frame_normalization import scale_to_max
+
+# False-colour maps by name; None keeps the image grey.
+COLORMAPS = {
+    "gray": None,
+    "inferno": cv2.COLORMAP_INFERNO,
+    "viridis": cv2.COLORMAP_VIRIDIS,
+    "jet": cv2.COLORMAP_JET,
+    "hot": cv2.COLORMAP_HOT,
+}
+
+# (image, scale) -> None; draws in place on the reduced RGB image. Frame
+# coordinates map to display coordinates by multiplying with `scale`.
+OverlayFn = Callable[[np.ndarray, float], None]
+
+
+def fit_size(width: int, height: int, target: Optional[Sequence[int]]) -> tuple[int, int]:
+    """Largest size within `target` that keeps the aspect ratio (never upscales)."""
+    if not target or target[0] <= 0 or target[1] <= 0:
+        return int(width), int(height)
+    scale = min(target[0] / float(width), target[1] / float(height), 1.0)
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+
+def build_display_lut(
+    max_value: int = 255,
+    *,
+    lo: float = 0.0,
+    hi: Optional[float] = None,
+    gamma: float = 1.0,
+    colormap: Optional[str] = None,
+) -> np.ndarray:
+    """
+    Lookup table mapping raw values to display values.
+
+    Contrast stretch [lo, hi] -> [0, 255], gamma and false colour are
+    combined into one table: (max_value + 1,) uint8 for grey or
+    (max_value + 1, 3) uint8 RGB when a colormap is given.
+    """
+    hi = float(max_value) if hi is None else float(hi)
+    x = np.arange(int(max_value) + 1, dtype=np.float32)
+    x = np.clip((x - float(lo)) / max(hi - float(lo), 1e-6), 0.0, 1.0)
+    if gamma != 1.0:
+        x **= 1.0 / float(gamma)
+    lut = np.rint(x * 255.0).astype(np.uint8)
+    cmap = COLORMAPS.get(colormap) if colormap else None
+    if cmap is None:
+        return lut
+    palette = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(256, 1), cmap)
+    palette = cv2.cvtColor(palette, cv2.COLOR_BGR2RGB).reshape(256, 3)
+    return palette[lut]
+
+
+class QImageBuffer:
+    """
+    Numpy buffer plus the QImage that wraps it without copying.
+
+    get() hands out the same memory as long as size and channel count do not
+    change. The QImage is only valid until the next get(); callers that keep
+    the picture convert it to a QPixmap (which copies) first.
+    """
+
+    def __init__(self) -> None:
+        self.array: Optional[np.ndarray] = None
+        self.qimage: Optional[QImage] = None
+        self._retired = None
+
+    def get(self, width: int, height: int, channels: int = 1) -> tuple[np.ndarray, QImage]:
+        shape = (height, width) if channels == 1 else (height, width, channels)
+        if self.array is None or self.array.shape != shape:
+            # A QImage handed out before the resize may still be on its way
+            # to the GUI thread; keep its memory alive for one more frame.
+            self._retired = (self.array, self.qimage)
+            self.array = np.empty(shape, dtype=np.uint8)
+            fmt = QImage.Format_Grayscale8 if channels == 1 else QImage.Format_RGB888
+            self.qimage = QImage(self.array.data, width, height, width * channels, fmt)
+        return self.array, self.qimage
+
+
+def render_frame(
+    frame: np.ndarray,
+    target_size: Optional[Sequence[int]] = None,
+    *,
+    lut: Optional[np.ndarray] = None,
+    overlay: Optional[OverlayFn] = None,
+    buffer: Optional[QImageBuffer] = None,
+) -> tuple[QImage, float]:
+    """
+    Reduce a frame to `target_size` and return (QImage, scale).
+
+    Grey frames go through `lut` (if given; otherwise non-8-bit frames are
+    scaled by their maximum), colour frames are treated as BGR. With an
+    overlay the output is RGB so overlays can be drawn in colour. The QImage
+    lives in `buffer` (a fresh buffer if None).
+    """
+    buffer = buffer or QImageBuffer()
+    h, w = frame.shape[:2]
+    dw, dh = fit_size(w, h, target_size)
+    scale = dw / float(w)
+    small = frame if (dw, dh) == (w, h) else cv2.resize(frame, (dw, dh), interpolation=cv2.INTER_AREA)
+
+    if small.ndim == 3:
+        out, qimg = buffer.get(dw, dh, 3)
+        if small.dtype != np.uint8:
+            small = scale_to_max(small, workers=1)
+        cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=out)
+    else:
+        if lut is not None:
+            idx = small if small.dtype.kind == "u" else np.clip(small, 0, lut.shape[0] - 1).astype(np.intp)
+            if lut.ndim == 2:
+                out, qimg = buffer.get(dw, dh, 3)
+                np.take(lut, idx, axis=0, out=out, mode="clip")
+            else:
+                gray = np.take(lut, idx, mode="clip")
+                out, qimg = _gray_into(buffer, gray, overlay is not None)
+        else:
+            if small.dtype != np.uint8:
+                small = scale_to_max(small, workers=1)
+            out, qimg = _gray_into(buffer, small, overlay is not None)
+
+    if overlay is not None:
+        overlay(out, scale)
+    return qimg, scale
+
+
+def _gray_into(buffer: QImageBuffer, gray: np.ndarray, as_rgb: bool):
+    h, w = gray.shape
+    if as_rgb:
+        out, qimg = buffer.get(w, h, 3)
+        cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB, dst=out)
+    else:
+        out, qimg = buffer.get(w, h, 1)
+        np.copyto(out, gray)
+    return out, qimg
+
+
+def hex_to_rgb(color: str) -> tuple[int, int, int]:
+    color = color.lstrip("#")
+    return int(color[0:2], 16), int(color[2:4], 16), int(color[4:6], 16)
+
+
+def draw_dashed_line(img: np.ndarray, p0, p1, color, thickness: int = 1, dash: int = 8) -> None:
+    """cv2 has no dashed lines; draw alternating segments of length `dash`."""
+    x0, y0 = p0
+    x1, y1 = p1
+    length = float(np.hypot(x1 - x0, y1 - y0))
+    if length < 1.0:
+        return
+    n = int(length // dash)
+    for i in range(0, n + 1, 2):
+        t0 = i * dash / length
+        t1 = min(1.0, (i + 1) * dash / length)
+        a = (int(round(x0 + (x1 - x0) * t0)), int(round(y0 + (y1 - y0) * t0)))
+        b = (int(round(x0 + (x1 - x0) * t1)), int(round(y0 + (y1 - y0) * t1)))
+        cv2.line(img, a, b, color, thickness, cv2.LINE_AA)
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _display_executor() -> ThreadPoolExecutor:
+    """One worker thread shared by all live views."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="FrameView")
+        return _executor
+
+
+class DisplayPipeline(QObject):
+    """
+    Renders frames for one view on the shared display worker.
+
+    submit() never blocks: at most one frame per view is being rendered and
+    one more is kept pending (latest wins), so a slow view drops frames
+    instead of queueing them. frameRendered delivers a QPixmap on the GUI
+    thread; the QImage buffer is reused for the next frame only after that.
+    """
+
+    frameRendered = Signal(QPixmap)
+    _rendered = Signal(object)
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.lut: Optional[np.ndarray] = None
+        self._buffer = QImageBuffer()
+        self._busy = False
+        self._pending = None
+        self._rendered.connect(self._on_rendered)
+
+    def submit(self, frame: np.ndarray, target_size: Sequence[int], overlay: Optional[OverlayFn] = None) -> None:
+        job = (frame, (int(target_size[0]), int(target_size[1])), overlay)
+        if self._busy:
+            self._pending = job
+            return
+        self._start(job)
+
+    def _start(self, job) -> None:
+        self._busy = True
+        _display_executor().submit(self._render, job)
+
+    def _render(self, job) -> None:
+        frame, target_size, overlay = job
+        try:
+            qimg, _scale = render_frame(frame, target_size, lut=self.lut, overlay=overlay, buffer=self._buffer)
+        except Exception as exc:
+            print(f"Error converting frame: {exc}")
+            qimg = None
+        self._rendered.emit(qimg)
+
+    @Slot(object)
+    def _on_rendered(self, qimg) -> None:
+        if qimg is not None:
+            self.frameRendered.emit(QPixmap.fromImage(qimg))
+        self._busy = False
+        job, self._pending = self._pending, None
+        if job is not None:
+            self._start(job)
+
+
+__all__ = [
+    "COLORMAPS",
+    "DisplayPipeline",
+    "QImageBuffer",
+    "build_display_lut",
+    "draw_dashed_line",
+    "fit_size",
+    "hex_to_rgb",
+    "render_frame",
+]
@@ -0,0 +1,239 @@
+"""Write analysis artefacts (images, tables, plots) on a background thread.
+
+An artefact set is split into two levels:
+
+- ``overlay``: what an operator looks at (overlay image, result table)
+- ``full``: everything else (intermediate images, plots)
+
+Each artefact value is a numpy image (written as TIFF or PNG), a pandas
+DataFrame (written as CSV) or a zero-argument callable. Callables are only
+evaluated on the writer thread and only if their level is written, so
+expensive artefacts (blends, plots) cost nothing when they are not saved.
+A callable returns an image/DataFrame to be written under its name, or
+None if it wrote its own file.
+
+``ArtefactWriter`` keeps a bounded queue: submit() returns immediately
+until ``max_queue`` sets are pending and then blocks, so a slow disk slows
+the producer down instead of growing memory without limit. Write errors
+are not lost on the writer thread: they go to ``on_error`` and are raised
+by the next flush() or close().
+"""
+
+from __future__ import annotations
+
+import collections
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Callable, Deque, Mapping, Optional, Tuple
+
+import cv2
+import numpy as np
+import pandas as pd
+
+ARTEFACTS_NONE = "none"
+ARTEFACTS_OVERLAY = "overlay"
+ARTEFACTS_FULL = "full"
+ARTEFACT_LEVELS = (ARTEFACTS_NONE, ARTEFACTS_OVERLAY, ARTEFACTS_FULL)
+
+IMAGE_FORMATS = {
+    # LZW-compressed TIFF (lossless, like the previous tiff_lzw output)
+    "tiff": (".tif", [cv2.IMWRITE_TIFF_COMPRESSION, 5]),
+    # PNG with fast compression
+    "png": (".png", [cv2.IMWRITE_PNG_COMPRESSION, 1]),
+}
+
+
+def _check(level: str, image_format: str) -> None:
+    if level not in ARTEFACT_LEVELS:
+        raise ValueError(f"unknown artefact level {level!r}; expected one of {ARTEFACT_LEVELS}")
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"unknown image format {image_format!r}; expected one of {tuple(IMAGE_FORMATS)}")
+
+
+def _write_one(out_dir: Path, name: str, value: Any, image_format: str) -> None:
+    if callable(value):
+        value = value()
+    if value is None:
+        return
+    if isinstance(value, pd.DataFrame):
+        value.to_csv(str(out_dir / f"{name}.csv"), index=False)
+        return
+    ext, params = IMAGE_FORMATS[image_format]
+    path = out_dir / f"{name}{ext}"
+    if not cv2.imwrite(str(path), np.ascontiguousarray(value), params):
+        raise OSError(f"Konnte {path} nicht schreiben")
+
+
+def write_artefacts(
+    out_dir: str | Path,
+    *,
+    overlay: Optional[Mapping[str, Any]] = None,
+    full: Optional[Mapping[str, Any]] = None,
+    level: str = ARTEFACTS_FULL,
+    image_format: str = "tiff",
+) -> None:
+    """Write an artefact set synchronously (same rules as ArtefactWriter)."""
+    _check(level, image_format)
+    if level == ARTEFACTS_NONE:
+        return
+    items = dict(overlay or {})
+    if level == ARTEFACTS_FULL:
+        items.update(full or {})
+    if not items:
+        return
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    for name, value in items.items():
+        _write_one(out, name, value, image_format)
+
+
+def _snapshot(items: Optional[Mapping[str, Any]]) -> dict:
+    """Copy arrays/DataFrames so the caller may reuse its buffers after submit()."""
+    out = {}
+    for name, value in (items or {}).items():
+        if isinstance(value, (np.ndarray, pd.DataFrame)):
+            value = value.copy()
+        out[name] = value
+    return out
+
+
+class ArtefactWriter:
+    """
+    Background writer with a bounded queue.
+
+    Parameters
+    ----------
+    level : str
+        Default artefact level: ``"none"``, ``"overlay"`` or ``"full"``.
+    image_format : str
+        ``"tiff"`` (LZW compressed) or ``"png"``.
+    max_queue : int
+        Artefact sets that may be pending before submit() blocks.
+    on_error : callable(out_dir, exc), optional
+        Called on the writer thread for every artefact set that failed.
+    max_errors : int
+        Failed sets kept in ``errors`` (oldest dropped first).
+
+    submit() copies arrays and DataFrames, so callers may reuse them right
+    away; callables must not depend on data the caller changes later.
+    Failures are printed, passed to `on_error` and kept in ``errors``;
+    flush() and close() raise an OSError for failures since the last check.
+    """
+
+    def __init__(
+        self,
+        level: str = ARTEFACTS_FULL,
+        image_format: str = "tiff",
+        *,
+        max_queue: int = 8,
+        on_error: Optional[Callable[[Path, Exception], None]] = None,
+        max_errors: int = 32,
+    ) -> None:
+        _check(level, image_format)
+        self.level = level
+        self.image_format = image_format
+        self.on_error = on_error
+        self.errors: Deque[Tuple[Path, Exception]] = collections.deque(maxlen=max(1, int(max_errors)))
+        self.error_count = 0
+        self._reported = 0
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ArtefactWriter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                out_dir, overlay, full, level, image_format = job
+                write_artefacts(out_dir, overlay=overlay, full=full, level=level, image_format=image_format)
+            except Exception as exc:
+                print(f"Artefakte konnten nicht geschrieben werden ({out_dir}): {exc}")
+                with self._lock:
+                    self.errors.append((out_dir, exc))
+                    self.error_count += 1
+                if self.on_error is not None:
+                    try:
+                        self.on_error(out_dir, exc)
+                    except Exception as cb_exc:
+                        print(f"on_error fehlgeschlagen: {cb_exc}")
+            finally:
+                self._queue.task_done()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.unfinished_tasks
+
+    def submit(
+        self,
+        out_dir: str | Path,
+        *,
+        overlay: Optional[Mapping[str, Any]] = None,
+        full: Optional[Mapping[str, Any]] = None,
+        level: Optional[str] = None,
+        image_format: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """
+        Queue an artefact set for `out_dir`.
+
+        Returns False if nothing was queued (level "none" or nothing to
+        write). Blocks while the queue is full; with `timeout` raises
+        queue.Full after that many seconds.
+        """
+        level = self.level if level is None else level
+        image_format = self.image_format if image_format is None else image_format
+        _check(level, image_format)
+        if self._closed:
+            raise RuntimeError("ArtefactWriter ist geschlossen")
+        if level == ARTEFACTS_NONE or not (overlay or (full and level == ARTEFACTS_FULL)):
+            return False
+        self._ensure_thread()
+        job = (Path(out_dir), _snapshot(overlay), _snapshot(full), level, image_format)
+        self._queue.put(job, timeout=timeout)
+        return True
+
+    def _raise_new_errors(self) -> None:
+        with self._lock:
+            new = self.error_count - self._reported
+            self._reported = self.error_count
+            if new <= 0:
+                return
+            out_dir, exc = self.errors[-1]
+        raise OSError(f"{new} Artefakt-Satz/Saetze nicht geschrieben, zuletzt {out_dir}: {exc}") from exc
+
+    def flush(self) -> None:
+        """Wait until every queued artefact set has been written; raise on failures."""
+        if self._thread is not None:
+            self._queue.join()
+        self._raise_new_errors()
+
+    def close(self) -> None:
+        """Write what is queued and stop the thread; raise on failures."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_new_errors()
+
+
+__all__ = [
+    "ARTEFACTS_FULL",
+    "ARTEFACTS_NONE",
+    "ARTEFACTS_OVERLAY",
+    "ARTEFACT_LEVELS",
+    "ArtefactWriter",
+    "IMAGE_FORMATS",
+    "write_artefacts",
+]
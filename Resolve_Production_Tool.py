@@ -54,6 +54,8 @@ from ie_Framework.Tools.Resolve import (autofocus, z_trieb, gitterschieber)
 from ie_Framework.Tools.Blaze import xy_stage as blaze_stage_test
 from ie_Framework.Hardware.Camera.pco_panda_camera import PcoCameraBackend
 from ie_Framework.Algorithm.laser_spot_detection import LaserSpotDetector as StageLaserSpotDetector
+from ie_Framework.UI.frame_view import COLORMAPS, DisplayPipeline, QImageBuffer, build_display_lut, render_frame
+from ie_Framework.Algorithm.frame_normalization import FrameNormalizer, percentile_range
 
 # Keep legacy in-file naming used across this module, but load lazily so
 # PMAC detection does not run during app startup.
@@ -263,6 +265,26 @@ class GlobalCameraRegistry:
             ("Optikkorper Cam B", 5),
         ]
         self._instances = {} # Map idx -> camera_instance
+        self._registered = set() # Indices of externally registered backends (replay, ...)
+    def register_camera(self, name, instance):
+        """Register a ready camera backend (get_frame()) under a new index and return it."""
+        idx = max([100] + [i + 1 for _, i in self.cams if i >= 100])
+        self.cams.append((name, idx))
+        self._instances[idx] = instance
+        self._registered.add(idx)
+        return idx
+    def add_replay(self, name, path, mode="realtime", loop=True):
+        """Register a recorded session (FrameRecorder directory) as a camera."""
+        from ie_Framework.Hardware.Camera.frame_recorder import ReplayCamera
+        instance = ReplayCamera(path, mode=mode, loop=loop)
+        instance.start()
+        return self.register_camera(name, instance)
+    def add_synthetic(self, name, scene="laser_spot", **kwargs):
+        """Register a SyntheticCamera (scene + ground truth) as a camera."""
+        from ie_Framework.Hardware.Camera.synthetic_camera import SyntheticCamera
+        instance = SyntheticCamera(scene, **kwargs)
+        instance.start()
+        return self.register_camera(name, instance)
     def get_instance(self, idx):
         if idx in self._instances:
             return self._instances[idx]
@@ -289,7 +311,7 @@ class GlobalCameraRegistry:
         return instance
     def get_provider(self, idx):
         """Returns a callable that returns a frame (QImage or numpy)."""
-        if idx in (-1, -2): # PCO
+        if idx in (-1, -2) or idx in self._registered: # PCO / registered backends
             def pco_provider():
                 cam = self.get_instance(idx)
                 if cam:
@@ -1738,23 +1760,13 @@ class DashboardView(QWidget):
         container.value_label = v_lbl # Reference for updates
         return container
 def frame_to_qpixmap(frame, target_size=None) -> QPixmap:
-    """Konvertiert ein BGR/Gray-Frame in QPixmap, skaliert auf target_size falls gegeben."""
+    """Konvertiert ein BGR/Gray-Frame in QPixmap, reduziert auf target_size falls gegeben."""
     if frame is None: return QPixmap()
     try:
-        if frame.ndim == 2:
-            h, w = frame.shape
-            qimg = QImage(frame.data, w, h, w, QImage.Format_Grayscale8)
-        elif frame.ndim == 3:
-            h, w, ch = frame.shape
-            # BGR zu RGB für QImage
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            qimg = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
-        else:
+        if frame.ndim not in (2, 3):
             return QPixmap()
-        pm = QPixmap.fromImage(qimg)
-        if target_size:
-            return pm.scaled(target_size[0], target_size[1], Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        return pm
+        qimg, _scale = render_frame(frame, target_size)
+        return QPixmap.fromImage(qimg)
     except Exception as e:
         print(f"Error converting frame: {e}")
         return QPixmap()
@@ -1784,10 +1796,60 @@ class CameraWidget(QWidget):
         layout.addWidget(self.status, 0)
         self._timer = QTimer(self)
         self._timer.timeout.connect(self._tick)
+        # Frames are reduced to the label size on the shared display worker.
+        self._display = DisplayPipeline(self)
+        self._display.frameRendered.connect(self.label.setPixmap)
+        # Contrast/false colour of grey frames (context menu on the image).
+        self._colormap = "gray"
+        self._contrast = None
+        self._lut_max = None
+        self.label.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.label.customContextMenuRequested.connect(self._show_display_menu)
     def set_provider(self, frame_provider):
         self._frame_provider = frame_provider
     def set_analyzer(self, analyzer):
         self._analyzer = analyzer
+    def set_display_mapping(self, colormap=None, contrast=None):
+        """False colour (name from COLORMAPS) and contrast range (lo, hi) in raw values for grey frames."""
+        self._colormap = colormap or "gray"
+        self._contrast = contrast
+        self._update_lut(self._last_frame)
+    def _update_lut(self, frame):
+        if self._colormap == "gray" and self._contrast is None:
+            self._display.lut = None
+            self._lut_max = None
+            return
+        max_value = self._lut_max_for(frame)
+        lo, hi = self._contrast if self._contrast is not None else (0.0, float(max_value))
+        self._display.lut = build_display_lut(max_value, lo=lo, hi=hi, colormap=self._colormap)
+        self._lut_max = max_value
+    @staticmethod
+    def _lut_max_for(frame):
+        # One LUT entry per raw value: 8 and 16 bit grey frames; others are clipped to 8 bit
+        dtype = getattr(frame, "dtype", np.dtype(np.uint8))
+        return int(np.iinfo(dtype).max) if dtype.kind == "u" and dtype.itemsize <= 2 else 255
+    def _show_display_menu(self, pos):
+        from PySide6.QtWidgets import QMenu
+        menu = QMenu()
+        menu.setStyleSheet(f"background-color: {COLORS['surface']}; color: {COLORS['text']}; border: 1px solid {COLORS['border']};")
+        cmap_actions = {}
+        for name in COLORMAPS:
+            act = menu.addAction(f"Farbskala: {name}")
+            act.setCheckable(True)
+            act.setChecked(name == self._colormap)
+            cmap_actions[act] = name
+        menu.addSeparator()
+        act_auto = menu.addAction("Kontrast an Bild anpassen")
+        frame = self._last_frame
+        act_auto.setEnabled(getattr(frame, "ndim", 0) == 2 and frame.dtype.kind == "u")
+        act_reset = menu.addAction("Kontrast zuruecksetzen")
+        action = menu.exec(self.label.mapToGlobal(pos))
+        if action in cmap_actions:
+            self.set_display_mapping(cmap_actions[action], self._contrast)
+        elif action == act_auto:
+            self.set_display_mapping(self._colormap, percentile_range(frame))
+        elif action == act_reset:
+            self.set_display_mapping(self._colormap, None)
     def open(self):
         self.start()
     def start(self):
@@ -1819,9 +1881,11 @@ class CameraWidget(QWidget):
         if isinstance(frame, QImage):
             pm = QPixmap.fromImage(frame)
             pm = pm.scaled(self.label.width(), self.label.height(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        else:
-            pm = frame_to_qpixmap(frame, (self.label.width(), self.label.height()))
-        self.label.setPixmap(pm)
+            self.label.setPixmap(pm)
+        elif getattr(frame, "ndim", 0) in (2, 3):
+            if self._lut_max is not None and frame.ndim == 2 and self._lut_max_for(frame) != self._lut_max:
+                self._update_lut(frame)
+            self._display.submit(frame, (self.label.width(), self.label.height()))
         if status_text:
             self.status.setText(status_text)
         else:
@@ -1894,8 +1958,13 @@ class PcoLaserController(QObject):
         super().__init__(parent)
         self.cam_index = cam_index
         self.detector = detector
+        self.tracker = autofocus.LaserSpotTracker()
         self._backend = None
         self._ref_point = None
+        self._last_image_number = None
+        self.display_size = None
+        self.frame_size = None
+        self._display_buffer = QImageBuffer()
         self._timeout_ms = 200
         self._last_init_attempt = 0.0
         self._retry_interval_s = 1.0
@@ -1908,6 +1977,7 @@ class PcoLaserController(QObject):
         try:
             self._backend = PcoCameraBackend(cam_index=self.cam_index)
             self._backend.start()
+            self._last_image_number = None
             self._last_init_error = None
         except Exception as exc:
             self._backend = None
@@ -1936,15 +2006,22 @@ class PcoLaserController(QObject):
             self._maybe_reinit_camera()
             return
         try:
-            frame = self._backend.get_frame()
+            number = self._backend.get_image_number()
+            if number is not None and number == self._last_image_number:
+                return
+            frame, number = self._backend.get_frame_with_number()
             if frame is None:
                 return
+            self._last_image_number = number
             qimg, (cx, cy) = autofocus.paint_laser_overlay(
                 frame,
-                self.detector,
+                self.tracker,
                 ref_point=self._ref_point,
                 is_dummy=False,
+                display_size=self.display_size,
+                buffer=self._display_buffer,
             )
+            self.frame_size = (int(frame.shape[1]), int(frame.shape[0]))
             self.frameReady.emit(qimg)
             self.centerChanged.emit(int(cx), int(cy))
         except Exception as exc:
@@ -2270,8 +2347,12 @@ class AutofocusView(QWidget):
             pass
     def _on_laser_frame(self, qimg: QImage):
         try:
-            self._last_qimage = qimg
-            self._last_frame_size = (qimg.width(), qimg.height())
+            # qimg wraps the reused render buffer; keep a copy of our own
+            self._last_qimage = qimg.copy()
+            frame_size = getattr(self._laser, "frame_size", None)
+            self._last_frame_size = frame_size or (qimg.width(), qimg.height())
+            if self._laser is not None and self.cam_embed is not None:
+                self._laser.display_size = (self.cam_embed.label.width(), self.cam_embed.label.height())
             ts = datetime.datetime.now().strftime('%H:%M:%S')
             if self._last_center is not None:
                 cx, cy = self._last_center
@@ -2296,7 +2377,8 @@ class AutofocusView(QWidget):
         try:
             min_ms = max(0.01, float(min_us) / 1000.0)
             max_ms = max(min_ms + 0.01, float(max_us) / 1000.0)
-            curr_ms = float(curr_us) / 1000.0
+            # Current exposure unknown (camera only known from the cache): keep the shown value
+            curr_ms = float(curr_us) / 1000.0 if curr_us is not None else min(max(self.spin_expo.value(), min_ms), max_ms)
             self.spin_expo.blockSignals(True)
             self.slider_expo.blockSignals(True)
             self.spin_expo.setRange(min_ms, max_ms)
@@ -4450,6 +4532,7 @@ class OptikkoerperView(QWidget):
         self._last_log_ts = {}
         self._last_log_msg = {}
         self._cam_timeouts = {}
+        self._normalizer = FrameNormalizer()
         layout = QVBoxLayout(self)
         layout.setContentsMargins(10, 10, 10, 10)
         layout.setSpacing(10)
@@ -4584,18 +4667,7 @@ class OptikkoerperView(QWidget):
         self._log_cam_status(idx, msg)
         return self._normalize_frame(frame), msg
     def _normalize_frame(self, frame):
-        if frame is None:
-            return None
-        if frame.dtype != np.uint8:
-            if frame.dtype == np.uint16:
-                frame = (frame >> 8).astype(np.uint8)
-            else:
-                max_val = float(frame.max()) if frame.size else 0.0
-                if max_val > 0:
-                    frame = (frame.astype(np.float32) / max_val * 255.0).astype(np.uint8)
-                else:
-                    frame = np.zeros_like(frame, dtype=np.uint8)
-        return frame
+        return self._normalizer(frame)
     def _init_exposure_controls(self, cam):
         if cam is None:
             return
@@ -4973,8 +5045,9 @@ class LaserscanView(QWidget):
         self._expo_initialized = False
         self._updating_expo = False
         self._frame_counter = 0
-        self._last_signature = None
+        self._last_image_number = None
         self._static_count = 0
+        self._normalizer = FrameNormalizer()
         self.cam_embed = None
         self.spin_expo = None
         self.slider_expo = None
@@ -5326,49 +5399,54 @@ class LaserscanView(QWidget):
             self._last_error = str(exc)
             return False
     def _get_frame(self):
+        """Live provider: only fetches pixels when the recorder has a new image."""
         if PcoCameraBackend is None:
             return None
         if not self._ensure_cam():
             return None
         try:
-            frame = self._cam.get_frame()
+            rec_count = self._cam.get_image_number()
         except Exception as exc:
             self._last_error = str(exc)
             return None
-        if frame is None:
+        if rec_count is not None and rec_count == self._last_image_number:
+            self._static_count += 1
+            ts = datetime.datetime.now().strftime('%H:%M:%S')
+            status = f"LIVE | {ts} | frame={self._frame_counter} | rec={rec_count}"
+            if self._static_count > 5:
+                status += f" | STATIC x{self._static_count}"
+            return None, status
+        return self._grab_frame()
+
+    def _grab_frame(self, wait_new: bool = False, timeout_s: float = 1.0):
+        """Return (frame_uint8, status) of the latest image.
+
+        With wait_new=True, blocks until the recorder has an image newer than
+        the last one handed out, so sequential measurements never analyse the
+        same image twice.
+        """
+        if PcoCameraBackend is None:
+            return None
+        if not self._ensure_cam():
             return None
-        if frame.dtype != np.uint8:
-            if frame.dtype == np.uint16:
-                frame = (frame >> 8).astype(np.uint8)
+        try:
+            if wait_new:
+                frame, rec_count = self._cam.wait_for_frame(self._last_image_number, timeout_s=timeout_s)
             else:
-                max_val = float(frame.max()) if frame.size else 0.0
-                if max_val > 0:
-                    frame = (frame.astype(np.float32) / max_val * 255.0).astype(np.uint8)
-                else:
-                    frame = np.zeros_like(frame, dtype=np.uint8)
+                frame, rec_count = self._cam.get_frame_with_number()
+        except Exception as exc:
+            self._last_error = str(exc)
+            return None
+        if frame is None:
+            return None
+        frame = self._normalizer(frame)
         self._frame_counter += 1
-        rec_count = None
-        if self._cam is not None:
-            rec_count = self._cam.get_recorded_count()
-        if frame.size:
-            sample = frame[::64, ::64]
-            signature = (int(sample.min()), int(sample.max()), int(sample.mean()))
-        else:
-            signature = (0, 0, 0)
-        if signature == self._last_signature:
-            self._static_count += 1
-        else:
-            self._static_count = 0
-            self._last_signature = signature
+        self._static_count = 0
+        self._last_image_number = rec_count
         ts = datetime.datetime.now().strftime('%H:%M:%S')
-        status = (
-            f"LIVE | {ts} | min={signature[0]} max={signature[1]} mean={signature[2]} "
-            f"| frame={self._frame_counter}"
-        )
+        status = f"LIVE | {ts} | frame={self._frame_counter}"
         if rec_count is not None:
             status += f" | rec={rec_count}"
-        if self._static_count > 5:
-            status += f" | STATIC x{self._static_count}"
         return frame, status
     def _init_exposure_controls(self):
         if self._cam is None or self.spin_expo is None or self.slider_expo is None:
@@ -5498,7 +5576,7 @@ class LaserscanView(QWidget):
     def _collect_prisma_angles(self, frame_count):
         angles = []
         for _ in range(frame_count):
-            frame_result = self._get_frame()
+            frame_result = self._grab_frame(wait_new=True)
             if not frame_result:
                 continue
             frame, _ = frame_result
@@ -5506,7 +5584,6 @@ class LaserscanView(QWidget):
             if angle is not None:
                 angles.append(angle)
             QApplication.processEvents()
-            time.sleep(0.04)
         return angles
 
     def _update_prisma_feedback(self, angles, target, tolerance, angle_label, delta_label, status_label):
@@ -5643,7 +5720,7 @@ class LaserscanView(QWidget):
         self._wavelength_running = True
         frame_result = None
         try:
-            frame_result = self._get_frame()
+            frame_result = self._grab_frame()
         finally:
             self._wavelength_running = False
             if self.btn_wavelength_check:
@@ -5692,7 +5769,7 @@ class LaserscanView(QWidget):
         if self.btn_line_width_capture:
             self.btn_line_width_capture.setEnabled(False)
         try:
-            frame_result = self._get_frame()
+            frame_result = self._grab_frame()
         finally:
             self._line_width_running = False
             if self.btn_line_width_capture:
@@ -5782,6 +5859,7 @@ class LaserscanView(QWidget):
         if self._cam is not None:
             self._cam.stop()
             self._cam = None
+        self._last_image_number = None
         self._expo_initialized = False
         super().hideEvent(event)
     def shutdown(self):